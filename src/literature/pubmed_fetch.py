@@ -1,11 +1,20 @@
 import argparse
+import hashlib
+import json
+import sys
 import yaml
 import os
+from pathlib import Path
 import pandas as pd
 from Bio import Entrez
 from Bio.Entrez.Parser import DictionaryElement
 import matplotlib.pyplot as plt
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from manifest import MANIFEST_NAME, hash_file, hash_value, skip_if_unchanged, stage_code, write_manifest
+
+PUBMED_OUTPUTS = ["pubmed_papers.csv", "summary_by_year.csv", "top_journals.csv", "papers_by_year.png"]
+
 # load configuration from YAML file
 def load_config(path: str) -> dict:
     with open(path) as f:
@@ -47,27 +56,86 @@ def fetch_pubmed(year: int, query: str, email: str, retmax: int) -> list[dict]:
 
     return papers
 
+# fetch papers through the source selected in the "sources" section of the config:
+# http/mirror query Entrez, local reads saved JSON files, replay reads them or records missing ones
+def fetch_pubmed_from_source(year: int, query: str, email: str, retmax: int, sources: dict | None = None) -> list[dict]:
+    sources = sources or {}
+    mode = sources.get("mode", "http")
+    if mode in ("http", "mirror"):
+        return fetch_pubmed(year, query, email, retmax)
+    if mode not in ("local", "replay"):
+        raise ValueError(f"Unknown sources mode: {mode}")
+    if not sources.get("path"):
+        raise ValueError(f"Sources mode '{mode}' requires 'path' in the sources section")
+
+    path = pubmed_cache_path(year, query, retmax, sources)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    if mode == "local":
+        raise FileNotFoundError(f"Brak zapisanych wyników PubMed: {path}")
+
+    papers = fetch_pubmed(year, query, email, retmax)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(papers, f, ensure_ascii=False)
+    return papers
+
+# one file per year and query, so changing the query never replays stale results
+def pubmed_cache_path(year: int, query: str, retmax: int, sources: dict) -> str:
+    key = hashlib.sha1(f"{query}|{retmax}".encode()).hexdigest()[:12]
+    return os.path.join(sources["path"], "pubmed", f"{year}_{key}.json")
+
+# manifest path, input hashes (query slice of the config, saved results if any, code version) and outputs
+def pubmed_stage(year: int, pubmed_config: dict, sources: dict | None, outdir: str) -> tuple:
+    inputs = {
+        "config": hash_value({"year": int(year), "query": pubmed_config["query"], "limit": pubmed_config["limit"]}),
+        "kod": stage_code("pubmed"),
+    }
+    if sources and sources.get("mode") in ("local", "replay"):
+        path = pubmed_cache_path(year, pubmed_config["query"], pubmed_config["limit"], sources)
+        if os.path.exists(path):
+            inputs["wyniki"] = hash_file(path)
+    outputs = [os.path.join(outdir, name) for name in PUBMED_OUTPUTS]
+    return os.path.join(outdir, MANIFEST_NAME), inputs, outputs
+
 def main():
     # parse arguments and load config
     parser = argparse.ArgumentParser(description="Perform a small literature search.")
     parser.add_argument("-y", "--year", required=True, help="Literature search will be limited to papers published in this year")
     parser.add_argument("--config")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the manifest says nothing changed")
 
     args = parser.parse_args()
     config = load_config(args.config)
-
-    # create output directory
     outdir = f"results/literature/{args.year}"
-    os.makedirs(outdir, exist_ok=True)
+
+    # skip the search if the query, code and outputs did not change since the last run
+    manifest_path, inputs, outputs = pubmed_stage(args.year, config["pubmed"], config.get("sources"), outdir)
+    skipped, reasons = skip_if_unchanged(manifest_path, f"pubmed {args.year}", inputs, outputs, args.force)
+    if skipped:
+        return
 
     # fetch papers from PubMed
-    papers = fetch_pubmed(
+    papers = fetch_pubmed_from_source(
         year=args.year,
         query=config["pubmed"]["query"],
         email=config["pubmed"]["email"],
         retmax=config["pubmed"]["limit"],
+        sources=config.get("sources"),
     )
 
+    save_outputs(papers, outdir)
+
+    # hash the inputs again: in replay mode the results have only now been recorded
+    _, inputs, _ = pubmed_stage(args.year, config["pubmed"], config.get("sources"), outdir)
+    write_manifest(manifest_path, f"pubmed {args.year}", inputs, outputs, reasons)
+
+# save papers, summary tables and plot for a single year
+def save_outputs(papers: list[dict], outdir: str) -> None:
+    # create output directory
+    os.makedirs(outdir, exist_ok=True)
+
     # Save papers metadata
     df = pd.DataFrame(papers)
     df.to_csv(f"{outdir}/pubmed_papers.csv", index=False)
@@ -0,0 +1,213 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+"""
+manifest.py
+--------------
+Content-hash manifests for skip-if-unchanged execution of the pipeline stages.
+
+Each stage run (run_analysis.main for a year, pubmed_fetch.main for a year, generate_report.main)
+writes a manifest.json next to its outputs with the hashes of its inputs (source archive,
+config slice, code version) and of its outputs. On the next run the stage compares the current
+input hashes with the manifest and checks that the outputs are still there and unmodified;
+if nothing relevant changed, the work is skipped and the outputs are only touched, so Snakemake
+timestamps stay consistent. This only helps when a stage is run directly or by run_pipeline.py:
+Snakemake deletes the outputs of a job before running it, so there it tracks the code files
+(rule inputs) and the config slices (rule params) itself.
+
+Usage:
+    python src/manifest.py                # why was each artifact (not) rebuilt
+    python src/manifest.py results/pm25   # only manifests under a given directory
+"""
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+SRC = Path(__file__).resolve().parent
+# source files (relative to src/) whose changes invalidate a stage; the Snakefile uses the same lists
+STAGE_CODE = {
+    "pm25": [f"pm25/{name}.py" for name in (
+        "run_analysis", "load_data", "quality", "compute_averages", "summary_cube", "visualizations", "sources"
+    )],
+    "pubmed": ["literature/pubmed_fetch.py"],
+    "report": ["report/generate_report.py", "pm25/summary_cube.py"],
+}
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """
+    SHA-256 of a file's content.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_value(value):
+    """
+    SHA-256 of a JSON-serializable value (e.g. a config slice); key order does not matter.
+    """
+    return hash_bytes(json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode())
+
+
+def hash_code(paths):
+    """
+    Code version: a hash over the contents of the given source files.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(str(p) for p in paths):
+        digest.update(Path(path).name.encode())
+        digest.update(hash_file(path).encode())
+    return digest.hexdigest()
+
+
+def stage_code(stage):
+    """
+    Code version of a stage: hash_code over its files from STAGE_CODE.
+    """
+    return hash_code([SRC / path for path in STAGE_CODE[stage]])
+
+
+def load_manifest(path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def stale_reasons(manifest_path, inputs, outputs):
+    """
+    Lists why a stage has to be rebuilt.
+
+    Args:
+        manifest_path (str): path of the stage manifest
+        inputs (dict): {input name: hash} for the current run
+        outputs (list[str]): output files of the stage
+
+    Returns:
+        list[str]: reasons to rebuild; an empty list means everything is up to date
+    """
+    manifest = load_manifest(manifest_path)
+    if manifest is None:
+        return ["brak manifestu"]
+
+    reasons = []
+    old_inputs = manifest["inputs"]
+    for name in sorted(set(inputs) | set(old_inputs)):
+        if inputs.get(name) != old_inputs.get(name):
+            reasons.append(f"zmienione wejście: {name}")
+
+    reasons += output_problems(manifest, outputs)
+    return reasons
+
+
+def output_problems(manifest, outputs=None):
+    """
+    Checks that the outputs recorded in a manifest still exist and have the recorded content.
+    """
+    recorded = manifest["outputs"]
+    problems = []
+    for path in outputs if outputs is not None else recorded:
+        path = str(path)
+        if not os.path.exists(path):
+            problems.append(f"brak wyniku: {path}")
+        elif path not in recorded:
+            problems.append(f"wynik spoza manifestu: {path}")
+        elif hash_file(path) != recorded[path]:
+            problems.append(f"zmieniony wynik: {path}")
+    return problems
+
+
+def write_manifest(manifest_path, stage, inputs, outputs, reasons):
+    """
+    Records the inputs and output hashes after a stage has been (re)built.
+
+    Input fingerprints should be taken after the stage ran (e.g. once a replay source has
+    recorded its file), so that the next run compares like with like.
+    """
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "stage": stage,
+        "inputs": inputs,
+        "outputs": {str(path): hash_file(path) for path in outputs},
+        "last_run": {"action": "rebuilt", "reasons": reasons, "time": time.strftime("%Y-%m-%d %H:%M:%S")},
+    }
+    _dump(manifest_path, manifest)
+
+
+def skip_if_unchanged(manifest_path, stage, inputs, outputs, force=False):
+    """
+    Decides whether a stage can be skipped.
+
+    If nothing changed, touches the outputs, records the skip in the manifest and returns
+    (True, []). Otherwise returns (False, reasons) and the caller rebuilds the stage and then
+    calls write_manifest with those reasons.
+    """
+    reasons = stale_reasons(manifest_path, inputs, outputs)
+    if force:
+        reasons = ["wymuszone przeliczenie"] + reasons
+    if reasons:
+        return False, reasons
+
+    for path in outputs:
+        os.utime(path)
+    manifest = load_manifest(manifest_path)
+    manifest["last_run"] = {"action": "skipped", "reasons": [], "time": time.strftime("%Y-%m-%d %H:%M:%S")}
+    _dump(manifest_path, manifest)
+    print(f"{stage}: wejścia i wyniki bez zmian - pomijam przeliczanie.")
+    return True, []
+
+
+def _dump(path, manifest):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+
+def explain(root):
+    """
+    Prints, for every manifest under root, what happened in the last run and why,
+    and whether its outputs are still as recorded.
+    """
+    paths = sorted(Path(root).rglob(MANIFEST_NAME))
+    if not paths:
+        print(f"Brak manifestów w {root}.")
+    for path in paths:
+        manifest = load_manifest(path)
+        if manifest is None:
+            print(f"{path}: nieobsługiwana wersja manifestu")
+            continue
+
+        last = manifest["last_run"]
+        action = "przeliczono" if last["action"] == "rebuilt" else "pominięto (bez zmian)"
+        print(f"{manifest['stage']} [{path.parent}]: {action} {last['time']}")
+        for reason in last["reasons"]:
+            print(f"    - {reason}")
+
+        problems = output_problems(manifest)
+        if problems:
+            print("    teraz nieaktualne:")
+            for problem in problems:
+                print(f"    - {problem}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show why each pipeline artifact was or wasn't rebuilt.")
+    parser.add_argument("root", nargs="?", default="results")
+    args = parser.parse_args()
+
+    explain(args.root)
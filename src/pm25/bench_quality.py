@@ -0,0 +1,83 @@
+import argparse
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from load_data import edit_df, read_gios_sheet
+from quality import qa_flags, qa_summary
+
+"""
+bench_quality.py
+--------------
+Skrypt porównuje czas kontroli jakości (``quality.qa_flags`` z wykrywaniem skoków) z czasem czyszczenia surowego
+arkusza (``load_data.edit_df``) na syntetycznych danych godzinowych dla całego roku.
+Samo wczytanie pliku .xlsx trwa dodatkowo wielokrotnie dłużej (opcja --xlsx), więc porównanie
+z samym ``edit_df`` jest ostrożne.
+"""
+
+
+def synthetic_raw_sheet(n_stations, year=2024, seed=0):
+    """
+    Tworzy surowy arkusz w układzie GIOŚ (wiersze opisowe, daty jako tekst, przecinki dziesiętne)
+    z wstrzykniętymi wartościami ujemnymi, seriami identycznych odczytów i skokami.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(f"{year}-01-01 01:00", f"{year + 1}-01-01 00:00", freq="h")
+    values = rng.gamma(2.0, 9.0, (len(index), n_stations)).round(1)
+
+    faults = rng.integers(0, len(index) - 48, n_stations)
+    values[faults, np.arange(n_stations)] = -5.0
+    values[faults[:, None] + np.arange(24) + 1, np.arange(n_stations)[:, None].repeat(24, axis=1)] = 12.3
+    values[(faults + 30) % len(index), np.arange(n_stations)] = 900.0
+
+    codes = [f"XxStac{i:04d}" for i in range(n_stations)]
+    header = pd.DataFrame([["Nr"] + list(range(1, n_stations + 1)),
+                           ["Kod stacji"] + codes,
+                           ["Wskaźnik"] + ["PM2.5"] * n_stations,
+                           ["Czas uśredniania"] + ["1g"] * n_stations])
+    data = pd.DataFrame(np.char.replace(values.astype(str), ".", ","))
+    data.insert(0, "czas", index.strftime("%Y-%m-%d %H:%M:%S"))
+    data.columns = range(n_stations + 1)
+    return pd.concat([header, data], ignore_index=True)
+
+
+def best_time(func, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main(n_stations, repeats, xlsx):
+    raw = synthetic_raw_sheet(n_stations)
+
+    if xlsx:
+        buffer = io.BytesIO()
+        raw.to_excel(buffer, header=False, index=False)
+        read_time, _ = best_time(lambda: read_gios_sheet(io.BytesIO(buffer.getvalue())), 1)
+
+    parse_time, cleaned = best_time(lambda: edit_df({2024: raw})[2024], repeats)
+    qa_time, flags = best_time(lambda: qa_flags(cleaned), repeats)
+
+    print(f"Stacji: {n_stations}, godzin: {len(cleaned)}")
+    print(f"edit_df: {parse_time * 1000:.1f} ms")
+    print(f"qa_flags: {qa_time * 1000:.1f} ms ({qa_time / parse_time:.0%} czasu edit_df)")
+    if xlsx:
+        print(f"read_gios_sheet (.xlsx): {read_time * 1000:.1f} ms "
+              f"(qa_flags: {qa_time / (read_time + parse_time):.0%} czasu wczytania i czyszczenia)")
+    print(f"Oflagowane pomiary: {qa_summary(flags)} "
+          f"(wstrzyknięto: zakres {n_stations}, serie {24 * n_stations}, skoki {n_stations})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark QA screening against sheet cleaning.")
+    parser.add_argument("--stations", type=int, default=150)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--xlsx", action="store_true", help="Also time reading the sheet from .xlsx (slow to prepare)")
+    args = parser.parse_args()
+
+    main(args.stations, args.repeats, args.xlsx)
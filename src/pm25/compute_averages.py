@@ -10,6 +10,102 @@ jakości powietrza.
 """
 
 
+NS_PER_HOUR = 3_600_000_000_000
+
+
+def to_day_hour(df):
+    """
+    Funkcja układa pomiary godzinowe w tablicę (dzień, godzina, stacja).
+
+    Indeks musi zawierać początki godzin uśredniania (jak po ``load_data.correct_datetime_index``).
+    Numer godziny liczony jest bezpośrednio z int64 indeksu; jeśli rok jest kompletny
+    (kolejne godziny bez luk), wynik jest widokiem na dane ramki, bez kopiowania.
+    Brakujące godziny są uzupełniane NaN. Powtórzonych godzin (np. przy zmianie czasu z letniego
+    na zimowy w strefie 'Europe/Warsaw') nie da się zmieścić w tablicy - do średnich dobowych
+    służy wtedy ``daily_sums``.
+
+    Args:
+        df (pd.DataFrame): Pomiary godzinowe (wiersze - godziny, kolumny - stacje).
+
+    Returns:
+        tuple[np.ndarray, pd.DatetimeIndex]: Tablica (dni x 24 x stacje) oraz daty kolejnych dni.
+
+    Raises:
+        ValueError: Jeśli ta sama godzina występuje w indeksie więcej niż raz.
+    """
+    values = df.to_numpy(dtype=float)
+    if len(df) == 0:
+        return values.reshape(0, 24, values.shape[1]), pd.DatetimeIndex([])
+
+    offset, first_day, n_days = _hour_offsets(df.index)
+    if len(offset) == n_days * 24 and (np.diff(offset) == 1).all():
+        cube = values.reshape(n_days, 24, -1)
+    else:
+        if len(np.unique(offset)) < len(offset):
+            raise ValueError("Powtórzone godziny w indeksie - użyj daily_sums.")
+        cube = np.full((n_days * 24, values.shape[1]), np.nan)
+        cube[offset] = values
+        cube = cube.reshape(n_days, 24, -1)
+
+    return cube, _day_index(first_day, n_days)
+
+
+def daily_sums(df):
+    """
+    Funkcja liczy dla każdego dnia i stacji sumę i liczbę pomiarów godzinowych (z pominięciem braków).
+
+    Zwykle korzysta z tablicy (dzień, godzina) z ``to_day_hour``. Jeśli ta sama godzina występuje
+    kilka razy (powtórzona godzina przy zmianie czasu na zimowy), pomiary są sumowane przez
+    ``np.add.at``, więc żaden nie ginie, a średnie dobowe zgadzają się z ``monthly_mean``.
+
+    Args:
+        df (pd.DataFrame): Pomiary godzinowe z indeksem początków godzin uśredniania.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, pd.DatetimeIndex]: Sumy i liczby pomiarów (dni x stacje) oraz daty dni.
+    """
+    if len(df) == 0 or df.index.is_unique:
+        cube, days = to_day_hour(df)
+        valid = ~np.isnan(cube)
+        return np.where(valid, cube, 0.0).sum(axis=1), valid.sum(axis=1), days
+
+    values = df.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    offset, first_day, n_days = _hour_offsets(df.index)
+    sums = np.zeros((n_days, values.shape[1]))
+    counts = np.zeros((n_days, values.shape[1]), dtype=int)
+    np.add.at(sums, offset // 24, np.where(valid, values, 0.0))
+    np.add.at(counts, offset // 24, valid)
+    return sums, counts, _day_index(first_day, n_days)
+
+
+def _hour_offsets(index):
+    # numery godzin liczone od północy pierwszego dnia
+    hours = index.as_unit('ns').asi8 // NS_PER_HOUR
+    first_day = hours.min() // 24
+    return hours - first_day * 24, first_day, hours.max() // 24 - first_day + 1
+
+
+def _day_index(first_day, n_days):
+    return pd.to_datetime((first_day + np.arange(n_days)) * 24 * NS_PER_HOUR, unit='ns')
+
+
+def daily_mean(df):
+    """
+    Funkcja liczy średnie dobowe dla każdej stacji (z ``daily_sums``) z pominięciem braków danych.
+
+    Args:
+        df (pd.DataFrame): Pomiary godzinowe z indeksem początków godzin uśredniania.
+
+    Returns:
+        pd.DataFrame: Średnie dobowe (wiersze - dni, kolumny - stacje); NaN dla dni bez pomiarów.
+    """
+    sums, counts, days = daily_sums(df)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    return pd.DataFrame(means, index=days, columns=df.columns)
+
+
 def monthly_mean(df):
     """
     Funkcja oblicza średnie mieięczne dla każdego roku i stacji 
@@ -44,10 +140,10 @@ def find_above_norm(df, years, sort_by, norm=15):
     
     norms = {}
 
-    df_group = df.groupby(df.index.date).mean() 
+    df_group = daily_mean(df)
 
     for year in years:
-        df_station = df_group[pd.to_datetime(df_group.index).year == year] # dane dla danego roku
+        df_station = df_group[df_group.index.year == year] # dane dla danego roku
         norms[year] = np.array((df_station>norm).sum().values) # liczba dni przekroczenia normy dla każdej stacji
 
     norms_df = pd.DataFrame(norms, index=df_group.columns)
@@ -56,33 +152,113 @@ def find_above_norm(df, years, sort_by, norm=15):
 
 # zadanie z województwami:
 
-def voivodeship_exceedances(df, voiv_map, years=(2015, 2018, 2021, 2024),norm = 15.0, station_col = "Kod stacji"):
+def station_group_index(station_codes, mapping):
     """
-    Liczy liczbę dni w roku, w których dobowa średnia PM2.5 uśredniona 
-    po wszystkich stacjach w danym województwie przekroczyła normę.
+    Przypisuje każdej stacji całkowity indeks grupy (województwa, miasta, własnego zbioru stacji).
+
+    Args:
+        station_codes (pd.Index): Kody stacji w kolejności kolumn macierzy danych.
+        mapping (dict | pd.Series): Mapowanie kodu stacji na nazwę grupy.
+
+    Returns:
+        tuple[np.ndarray, pd.Index]: Tablica kodów grup (-1 dla stacji spoza mapowania)
+        oraz posortowane etykiety grup.
+    """
+    labels = pd.Index(station_codes).map(mapping)
+    codes, groups = pd.factorize(labels, sort=True)
+    return codes, pd.Index(groups)
+
+
+def group_daily_means(df_daily, codes, n_groups):
+    """
+    Liczy średnie dobowe po grupach stacji jednym mnożeniem macierzy z macierzą wskaźnikową.
+
+    Braki danych nie wchodzą ani do sumy, ani do liczby pomiarów, więc wynik jest
+    równy średniej z pominięciem NaN (jak w ``groupby().mean()``).
+
+    Args:
+        df_daily (pd.DataFrame): Średnie dobowe (wiersze - dni, kolumny - stacje).
+        codes (np.ndarray): Indeks grupy dla każdej kolumny (-1 = stacja pominięta).
+        n_groups (int): Liczba grup.
+
+    Returns:
+        np.ndarray: Macierz (dni x grupy) ze średnimi; NaN gdy w grupie brak pomiarów.
+    """
+    values = df_daily.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+
+    # macierz wskaźnikowa stacja -> grupa (stacje bez grupy mają same zera)
+    indicator = np.zeros((values.shape[1], n_groups))
+    mapped = codes >= 0
+    indicator[np.flatnonzero(mapped), codes[mapped]] = 1.0
+
+    sums = np.where(valid, values, 0.0) @ indicator
+    counts = valid.astype(float) @ indicator
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def group_exceedances(df, groupings, years=None, norm=15.0, station_col="Kod stacji"):
+    """
+    Liczy liczbę dni w roku, w których dobowa średnia PM2.5 uśredniona po stacjach
+    danej grupy przekroczyła normę - dla wielu podziałów stacji naraz.
+
+    Średnie dobowe na stację liczone są raz, a następnie dla każdego podziału
+    (np. województwa, miasta, własne zbiory stacji z konfiguracji) wykonywana jest
+    jedna redukcja macierzowa i jedno zliczenie przekroczeń po latach.
+
+    Args:
+        df (pd.DataFrame): Pomiary godzinowe z DatetimeIndex.
+        groupings (dict): Słownik {nazwa podziału: mapowanie kod stacji -> grupa}. Zamiast mapowania
+            można podać listę kodów stacji - wtedy tworzą one jedną grupę o nazwie podziału.
+        years (list[int], optional): Lata do analizy. Domyślnie wszystkie lata w danych.
+        norm (float, optional): Dobowa norma PM2.5. Domyślnie 15 µg/m³.
+        station_col (str, optional): Poziom kolumn z kodami stacji.
+
+    Returns:
+        pd.DataFrame: MultiIndex ['podział', 'grupa'], kolumny to lata z liczbą dni przekroczenia normy.
     """
-    # Średnia dobowa na stację:
-    df_daily = df.resample("D").mean()
+    df_daily = daily_mean(df)
 
-    # Wyciąganie kodów stacji z kolumn
     if isinstance(df_daily.columns, pd.MultiIndex):
-        station_codes = df_daily.columns.get_level_values("Kod stacji")
+        station_codes = df_daily.columns.get_level_values(station_col)
     else:
         station_codes = pd.Index(df_daily.columns)
 
-    # mapowanie województw dla stacji
-    voiv_for_station = station_codes.map(voiv_map)
+    day_years = df_daily.index.year.to_numpy()
+    if years is None:
+        years = np.unique(day_years).tolist()
+    years = list(years)
+    # macierz wskaźnikowa dzień -> rok, do zliczania przekroczeń bez pętli po latach
+    year_indicator = (day_years[:, None] == np.asarray(years)[None, :]).astype(float)
+
+    frames = []
+    for name, mapping in groupings.items():
+        if isinstance(mapping, (list, tuple, set)):
+            mapping = {code: name for code in mapping}
+        codes, groups = station_group_index(station_codes, mapping)
+        means = group_daily_means(df_daily, codes, len(groups))
+        with np.errstate(invalid="ignore"):
+            above = (means > norm).astype(float)
+        counts = (above.T @ year_indicator).astype(int)
+
+        index = pd.MultiIndex.from_product([[name], groups], names=["podział", "grupa"])
+        frames.append(pd.DataFrame(counts, index=index, columns=years))
 
-    # Średnia dobowa po województwach
-    df_voiv_daily = (df_daily.T.groupby(voiv_for_station).mean().T)
+    if not frames:
+        return pd.DataFrame(columns=years)
+    return pd.concat(frames)
 
-    # Zliczanie dni powyżej normy w każdym roku
-    out = {}
-    for y in years:
-        df_y = df_voiv_daily[df_voiv_daily.index.year == y]
-        out[y] = (df_y > norm).sum()  
-        
-    return pd.DataFrame(out).sort_index()
+
+def voivodeship_exceedances(df, voiv_map, years=(2015, 2018, 2021, 2024),norm = 15.0, station_col = "Kod stacji"):
+    """
+    Liczy liczbę dni w roku, w których dobowa średnia PM2.5 uśredniona 
+    po wszystkich stacjach w danym województwie przekroczyła normę.
+    """
+    out = group_exceedances(df, {"województwo": voiv_map}, years=years, norm=norm, station_col=station_col)
+    out = out.droplevel("podział")
+    out.index.name = station_col
+    return out.sort_index()
 
 
 if __name__ == "__main__":
@@ -3,6 +3,9 @@ import requests
 import zipfile
 import io
 import re
+import datetime
+import numbers
+import importlib.util
 
 """
 load_data.py
@@ -10,42 +13,74 @@ load_data.py
 Moduł obsłukuje wczytywanie danych i przygotowuje je do dalszej analizy 
 
 Funkcje:
+- fetch_gios_archive / read_gios_archive: osobno pobieranie archiwum ZIP i wczytywanie z niego arkusza Exel
 - download_gios_archive: pobiera archiwum ZIP i wczytuje arkusz Exel 
 - download_multiple_gios_archives: zarządza wczytywaniem danych  
+- detect_layout: rozpoznaje układ arkusza (nagłówek, początek danych, zapis dat, jednostki) z pierwszych wierszy
+- read_gios_sheet: wczytuje z arkusza tylko blok danych
 - edit_df: czyści dane i ujednolica format w rankach danych 
+- fetch_gios_metadata / read_gios_metadata: osobno pobieranie i wczytywanie pliku z metadanymi
 - download_gios_metadata: pobiera metadane z opisem i lokalizacją stacji, wyczytuje plik exel
 - create_code_map: mapuje nowe kody stacji do nowych i koryguje stare kody w ramkach danych
 - multiindex_code_city: Tworzy multiindex z nazwami miejscowości nad kodami stacji 
-- correct_datetime_index: Korekta godziny - przesunięcie z 00:00 na 23:59:59 poprzedniego dnia 
+- hour_period_ids: zamienia znaczniki czasu na całkowite numery godzin uśredniania (z opcjonalną zmianą strefy)
+- correct_datetime_index: ustawia indeks na początek godziny uśredniania (pomiar z 00:00 trafia do poprzedniego dnia)
+- split_calendar_years: przenosi godziny, które po zmianie strefy wypadły w sąsiednim roku, do ramki tego roku
 - save_combined_data: Łączy ramki danych w jeden DataFrame i zapisuje do pliku CSV
 """
 
-def download_gios_archive(year, gios_id, filename, gios_archive_url):
+GIOS_ARCHIVE_URL = "https://powietrze.gios.gov.pl/pjp/archives/downloadFile/"
+
+# do rozpoznania układu arkusza wystarcza kilkanaście pierwszych wierszy
+N_PROBE_ROWS = 20
+PATTERN_DATE = re.compile(r"\d{4}-\d{2}-\d{2}(\s+\d{2}:\d{2}(:\d{2})?)?") # data (i godzina) zapisana jako tekst
+PATTERN_STATION_CODE = r"[A-Z][a-z][A-Za-z0-9]{4,}" # np. MzWarAlNiepo, DsWrocWybCon
+EXCEL_SERIAL_RANGE = (25000, 75000) # liczby seryjne dat Excela dla lat ok. 1968-2105
+
+NS_PER_HOUR = 3_600_000_000_000
+# GIOŚ podaje czas środkowoeuropejski bez zmiany na czas letni (UTC+1)
+GIOS_TIMEZONE = "Etc/GMT-1"
+
+# calamine (pakiet python-calamine) wczytuje .xlsx wielokrotnie szybciej niż openpyxl
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else None
+
+
+def fetch_gios_archive(gios_id, gios_archive_url):
     """
-    Funkcja pobiera archiwum ZIP dla podanego roku z GIOŚ, rozpakowuje je w pamięci i wczytuje arkusz Excel. 
-    
+    Funkcja pobiera archiwum ZIP z GIOŚ do pamięci (bez rozpakowywania).
+
     Args:
-        year (list[int]): rok dla którgo pobierane są dane
-        gios_id (str): id zaspobu 
-        filename (str): nazwa pliku (.xlsx) wewnątrz pobranego archiwum ZIP.
+        gios_id (str): id zasobu
         gios_archive_url (str): bazowy adres URL punktu końcowego archiwum GIOŚ
-    
+
     Returns:
-        pd.DataFrame: ramka danych z pomiarami godzinowymi wartości PM2.5 dla danego roku
-        lub None w przypadku błedu 
-    
+        bytes: zawartość archiwum ZIP
+
     Rises:
         requests.exceptions.HTTPError: Jeśli wystąpi problem z połączeniem lub zasób nie istnieje.
-
     """
-    # Pobranie archiwum ZIP do pamięci
-  
     url = f"{gios_archive_url}{gios_id}"
     response = requests.get(url)
     response.raise_for_status()  # jeśli błąd HTTP, zatrzymaj
-    
+    return response.content
+
+
+def read_gios_archive(content, year, filename):
+    """
+    Funkcja rozpakowuje archiwum ZIP w pamięci i wczytuje arkusz Excel z pomiarami.
+
+    Args:
+        content (bytes): zawartość archiwum ZIP
+        year (int): rok, którego dotyczą dane (do komunikatów o błędach)
+        filename (str): nazwa pliku (.xlsx) wewnątrz archiwum ZIP.
+
+    Returns:
+        pd.DataFrame: ramka danych z pomiarami godzinowymi wartości PM2.5 dla danego roku
+        (tylko blok danych, zob. ``read_gios_sheet``) lub None w przypadku błedu
+    """
+    df = None
     # Otwórz zip w pamięci
-    with zipfile.ZipFile(io.BytesIO(response.content)) as z:
+    with zipfile.ZipFile(io.BytesIO(content)) as z:
         # znajdź właściwy plik z PM2.5
         if filename not in z.namelist():
             print(f"Błąd: nie znaleziono {filename}.")
@@ -53,13 +88,35 @@ def download_gios_archive(year, gios_id, filename, gios_archive_url):
             # wczytaj plik do pandas
             with z.open(filename) as f:
                 try:
-                    df = pd.read_excel(f, header=None)
+                    df = read_gios_sheet(io.BytesIO(f.read()))
                 except Exception as e:
                     print(f"Błąd przy wczytywaniu {year}: {e}")
     return df
 
 
-def download_multiple_gios_archives(years, gios_ids, filenames, gios_archive_url=None):
+def download_gios_archive(year, gios_id, filename, gios_archive_url):
+    """
+    Funkcja pobiera archiwum ZIP dla podanego roku z GIOŚ, rozpakowuje je w pamięci i wczytuje arkusz Excel. 
+    
+    Args:
+        year (list[int]): rok dla którgo pobierane są dane
+        gios_id (str): id zaspobu 
+        filename (str): nazwa pliku (.xlsx) wewnątrz pobranego archiwum ZIP.
+        gios_archive_url (str): bazowy adres URL punktu końcowego archiwum GIOŚ
+    
+    Returns:
+        pd.DataFrame: ramka danych z pomiarami godzinowymi wartości PM2.5 dla danego roku
+        lub None w przypadku błedu 
+    
+    Rises:
+        requests.exceptions.HTTPError: Jeśli wystąpi problem z połączeniem lub zasób nie istnieje.
+
+    """
+    content = fetch_gios_archive(gios_id, gios_archive_url)
+    return read_gios_archive(content, year, filename)
+
+
+def download_multiple_gios_archives(years, gios_ids, filenames, gios_archive_url=None, source=None):
     """
     Jest to funkcja nadrzędna, która zarządza procesem wczytywania danych dla wielu lat.
     
@@ -68,12 +125,21 @@ def download_multiple_gios_archives(years, gios_ids, filenames, gios_archive_url
         gios_id (dict): Słownik przypisujący identyfikator pliku w bazie GIOŚ (wartość) do roku (klucz)
         file_names (dict): Słownik przypisujący nazwę pliku .xlsx (wartość) do roku (klucz)
         gios_archive_url (str, optional): Podstawowy adres URL API GIOŚ. Domyślna wartość to None
+        source (sources.Source, optional): Źródło plików (HTTP, katalog lokalny, lustro, nagrania).
+            Jeśli podane, archiwa dla wszystkich lat pobierane są jednym wywołaniem ``source.prefetch``.
     
     Returns:
         dict : Słownik mapujący ramki danych do każdego roku {rok: df}.
     """
+    if source is not None:
+        contents = source.prefetch([gios_ids[year] for year in years])
+        return {
+            year: read_gios_archive(contents[gios_ids[year]], year, filenames[year])
+            for year in years
+        }
+
     if gios_archive_url is None:
-        gios_archive_url = "https://powietrze.gios.gov.pl/pjp/archives/downloadFile/"
+        gios_archive_url = GIOS_ARCHIVE_URL
 
     data = {}
     for year in years:
@@ -83,13 +149,104 @@ def download_multiple_gios_archives(years, gios_ids, filenames, gios_archive_url
     return data
 
 
+def detect_layout(head):
+    """
+    Funkcja rozpoznaje układ arkusza GIOŚ na podstawie kilku pierwszych wierszy.
+
+    Arkusze z różnych lat różnią się liczbą i kolejnością wierszy opisowych ("Nr", "Wskaźnik",
+    "Czas uśredniania", "Jednostka", "Kod stanowiska") oraz zapisem dat (tekst, data Excela
+    lub liczba seryjna Excela). Wiersz nagłówka to wiersz zaczynający się od "Kod stacji",
+    a jeśli takiego nie ma - pierwszy wiersz, w którym większość komórek wygląda jak kody stacji.
+
+    Args:
+        head (pd.DataFrame): pierwsze wiersze arkusza wczytanego z header=None
+
+    Returns:
+        dict: klucze 'header_row' (numer wiersza z kodami stacji), 'data_start' (numer pierwszego
+        wiersza z pomiarami), 'date_encoding' ('text', 'datetime' lub 'excel_serial')
+        i 'units' (jednostka lub None)
+
+    Raises:
+        ValueError: Jeśli w badanych wierszach nie ma nagłówka lub pierwszego wiersza z datą.
+    """
+    first = head.iloc[:, 0]
+    labels = first.astype(str).str.strip().str.lower()
+
+    header_rows = labels.index[labels == 'kod stacji']
+    if len(header_rows) == 0:
+        codes = head.iloc[:, 1:].apply(lambda col: col.astype(str).str.fullmatch(PATTERN_STATION_CODE))
+        header_rows = codes.index[codes.mean(axis=1) > 0.5]
+    if len(header_rows) == 0:
+        raise ValueError(f"Nie znaleziono wiersza z kodami stacji w pierwszych {len(head)} wierszach.")
+    header_row = head.index.get_loc(header_rows[0])
+
+    data_start, date_encoding = None, None
+    for i in range(header_row + 1, len(head)):
+        date_encoding = _date_encoding(first.iloc[i])
+        if date_encoding is not None:
+            data_start = i
+            break
+    if data_start is None:
+        raise ValueError(f"Nie znaleziono wiersza z pomiarami w pierwszych {len(head)} wierszach.")
+
+    units = None
+    unit_rows = labels.iloc[header_row:data_start]
+    unit_rows = unit_rows.index[unit_rows.str.startswith('jednostka')]
+    if len(unit_rows) > 0:
+        values = head.loc[unit_rows[0]].iloc[1:].dropna()
+        units = values.iloc[0] if len(values) > 0 else None
+
+    return {'header_row': header_row, 'data_start': data_start, 'date_encoding': date_encoding, 'units': units}
+
+
+def _date_encoding(value):
+    # rozpoznanie zapisu daty w pierwszej komórce wiersza (None - wiersz nie zawiera daty)
+    if isinstance(value, (pd.Timestamp, datetime.datetime)):
+        return 'datetime'
+    if isinstance(value, str):
+        return 'text' if PATTERN_DATE.match(value.strip()) else None
+    if isinstance(value, numbers.Real) and EXCEL_SERIAL_RANGE[0] <= value <= EXCEL_SERIAL_RANGE[1]:
+        return 'excel_serial'
+    return None
+
+
+def read_gios_sheet(f, n_probe=N_PROBE_ROWS):
+    """
+    Funkcja wczytuje z arkusza GIOŚ tylko blok danych: najpierw czyta ``n_probe`` pierwszych wierszy
+    i rozpoznaje układ, a potem wczytuje pomiary z pominięciem wierszy opisowych (skiprows)
+    i pustych kolumn (usecols). Jeśli zainstalowany jest pakiet python-calamine, używany jest
+    szybszy silnik calamine.
+
+    Args:
+        f (file-like): plik .xlsx otwarty w trybie binarnym (z możliwością przewijania)
+        n_probe (int, optional): liczba wierszy używanych do rozpoznania układu
+
+    Returns:
+        pd.DataFrame: ramka z kolumną 'Kod stacji' (daty) i kolumnami z kodami stacji;
+        rozpoznany układ zapisany jest w ``df.attrs['gios_layout']``
+    """
+    head = pd.read_excel(f, header=None, nrows=n_probe, engine=EXCEL_ENGINE)
+    layout = detect_layout(head)
+
+    header = head.iloc[layout['header_row']]
+    usecols = [i for i, code in enumerate(header) if i == 0 or pd.notna(code)]
+
+    f.seek(0)
+    df = pd.read_excel(f, header=None, skiprows=layout['data_start'], usecols=usecols, engine=EXCEL_ENGINE)
+    df.columns = ['Kod stacji'] + [str(code).strip() for code in header.iloc[usecols[1:]]]
+    df.attrs['gios_layout'] = layout
+    return df
 
 
 def edit_df(df_dict):
     """
     Funkcja usuwa niepotrzebne wiersze i ujednolica strukturę danych
-    Proces obejmuje usuwanie wierszy opisowych, zaokrąglanie czasu do pełnych godzin (w dół)
-    i ustawienie daty jako indeksu. 
+    Proces obejmuje usuwanie wierszy opisowych, zamianę dat na datetime i ustawienie daty jako indeksu.
+    Obcięcie czasu do pełnych godzin wykonuje ``correct_datetime_index``.
+
+    Układ arkusza (wiersz nagłówka, początek danych, zapis dat) rozpoznawany jest na podstawie
+    kilku pierwszych wierszy (``detect_layout``), więc nie ma przeglądania wiersz po wierszu.
+    Ramki wczytane przez ``read_gios_sheet`` zawierają już tylko blok danych.
     
     Args:
         df_dict (dict): słownik mapujący surowe dane w ramkach danych do roku {rok: df}
@@ -100,51 +257,71 @@ def edit_df(df_dict):
     out = {} 
 
     for year, df in df_dict.items():
-        df_edited = df.copy()
-        pattern_date = re.compile(r"\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}") # wzorzec daty i godziny do usuwania niepotrzebnych wierszy
-        rows_to_drop = []
-        header_row_id = None
-
-        for i in range(len(df_edited)):
-            
-            row = df_edited.iloc[i, 0]
-            if row == 'Kod stacji': # znalezienie indeksu z kodami stacji (aby ustawić jako nagłówki kolumn)
-                header_row_id = i
-            elif not pattern_date.match(str(row)):
-                rows_to_drop.append(i)
-
-        df_edited.drop(labels=rows_to_drop, axis=0, inplace=True) # usuń niepotrzebne wiersze
-        df_edited.columns = df.loc[header_row_id] # ustaw nagłówki kolumn
-        df_edited.drop(labels=[header_row_id], axis=0, inplace=True) # usuń wiersz z nagłówkami
-        df_edited.reset_index(drop=True, inplace=True) # zresetuj indeksy
-        df_edited['Kod stacji'] = pd.to_datetime(df_edited['Kod stacji']) # zmień typ kolumny z kodami stacji na datetime
-        df_edited['Kod stacji'] = df_edited['Kod stacji'].dt.floor('h') # zaokrąglij do najbliższej godziny w dół
+        layout = df.attrs.get('gios_layout')
+        if layout is None:
+            # surowy arkusz wczytany z header=None: wytnij blok danych
+            layout = detect_layout(df.head(N_PROBE_ROWS))
+            header = df.iloc[layout['header_row']]
+            df_edited = df.iloc[layout['data_start']:].copy()
+            df_edited.columns = ['Kod stacji'] + [str(code).strip() for code in header.iloc[1:]]
+        else:
+            df_edited = df.copy()
+
+        dates = df_edited['Kod stacji']
+        if layout['date_encoding'] == 'excel_serial':
+            dates = pd.to_datetime(pd.to_numeric(dates, errors='coerce'), unit='D', origin='1899-12-30')
+        else:
+            dates = pd.to_datetime(dates, errors='coerce')
+        if layout['date_encoding'] != 'text':
+            dates = dates.dt.round('s') # daty z Excela mają błędy zaokrągleń rzędu milisekund
+        df_edited['Kod stacji'] = dates # obcięcie do pełnych godzin: correct_datetime_index
+
+        df_edited = df_edited[df_edited['Kod stacji'].notna()] # usuń wiersze bez daty (np. podsumowania pod danymi)
+        df_edited = df_edited.loc[:, df_edited.columns != 'nan'] # puste kolumny bez kodu stacji
         df_edited.set_index('Kod stacji', inplace=True) # ustaw kolumnę z kodami stacji jako indeks
-        # Zamiana przecinka na kropkę i konwersja wszystkich kolumn na liczby
-        for col in df_edited.columns:
-            df_edited[col] = pd.to_numeric(df_edited[col].astype(str).str.replace(',', '.'), errors='coerce')
+
+        # Zamiana przecinka na kropkę i konwersja kolumn tekstowych na liczby
+        text_cols = df_edited.columns[~df_edited.dtypes.map(pd.api.types.is_numeric_dtype)]
+        df_edited[text_cols] = df_edited[text_cols].apply(
+            lambda col: pd.to_numeric(col.astype(str).str.replace(',', '.'), errors='coerce')
+        )
+        df_edited = df_edited.astype(float)
+        df_edited.attrs['gios_layout'] = layout
     
         out[year] = df_edited
 
     return out
 
 
-def download_gios_metadata(url):
+def fetch_gios_metadata(url):
     """
-    Funkcja pobiera plik Excel z metadanymi stacji pomiarowych (lokalizacje, kody)
-    
+    Funkcja pobiera plik Excel z metadanymi stacji do pamięci (bez wczytywania).
+
     Args:
         url (str): Adres URL do pliku Excel z metadanymi.
-    
+
     Returns:
-        pd.DataFrame: Ramka danych z metadanymi lub None w przypadku błędu.
-    
-    Rises: 
+        bytes: zawartość pliku Excel
+
+    Rises:
         requests.exceptions.HTTPError: Jeśli wystąpi problem z połączeniem lub zasób nie istnieje.
     """
     response = requests.get(url)
     response.raise_for_status()
-    with io.BytesIO(response.content) as f:
+    return response.content
+
+
+def read_gios_metadata(content):
+    """
+    Funkcja wczytuje metadane stacji z zawartości pliku Excel.
+
+    Args:
+        content (bytes): zawartość pliku Excel z metadanymi
+
+    Returns:
+        pd.DataFrame: Ramka danych z metadanymi lub None w przypadku błędu.
+    """
+    with io.BytesIO(content) as f:
         try:
             gios_metadata = pd.read_excel(f, header=0)
             return gios_metadata
@@ -153,6 +330,22 @@ def download_gios_metadata(url):
             return None
 
 
+def download_gios_metadata(url):
+    """
+    Funkcja pobiera plik Excel z metadanymi stacji pomiarowych (lokalizacje, kody)
+    
+    Args:
+        url (str): Adres URL do pliku Excel z metadanymi.
+    
+    Returns:
+        pd.DataFrame: Ramka danych z metadanymi lub None w przypadku błędu.
+    
+    Rises: 
+        requests.exceptions.HTTPError: Jeśli wystąpi problem z połączeniem lub zasób nie istnieje.
+    """
+    return read_gios_metadata(fetch_gios_metadata(url))
+
+
 def create_code_map(gios_metadata, df_dict):
     """
     Mapuje nowe kody stacji do starych i aktualizuje nazwy kolumn w ramkach danych.
@@ -222,21 +415,89 @@ def multiindex_code_city(df_dict, metadata):
     return out
 
 
-def correct_datetime_index(df_dict):
+def hour_period_ids(index, source_tz=None, target_tz=None):
+    """
+    Funkcja zamienia znaczniki czasu pomiarów na całkowite identyfikatory okresów uśredniania.
+
+    GIOŚ oznacza pomiar godzinowy końcem okresu uśredniania (np. 01:00 to średnia z 00:00-01:00,
+    a 00:00 to ostatnia godzina poprzedniej doby). Identyfikator to liczba pełnych godzin od
+    1970-01-01 do końca okresu, więc okres o identyfikatorze ``p`` zaczyna się w godzinie ``p - 1``.
+    Niepełne godziny są obcinane w dół.
+
+    Args:
+        index (pd.DatetimeIndex): znaczniki czasu pomiarów
+        source_tz (str, optional): strefa czasowa danych, jeśli indeks jej nie ma (np. GIOS_TIMEZONE)
+        target_tz (str, optional): strefa, w której liczone są doby, np. 'UTC' lub 'Europe/Warsaw'
+            (czas lokalny CET/CEST). Domyślnie bez zmiany strefy.
+
+    Returns:
+        np.ndarray: identyfikatory okresów (int64)
+    """
+    index = pd.DatetimeIndex(index)
+    if source_tz is not None and index.tz is None:
+        index = index.tz_localize(source_tz)
+    if target_tz is not None:
+        index = index.tz_convert(target_tz)
+    if index.tz is not None:
+        index = index.tz_localize(None) # czas "na zegarku" w strefie docelowej
+    return index.as_unit('ns').asi8 // NS_PER_HOUR
+
+
+def correct_datetime_index(df_dict, target_tz=None, source_tz=GIOS_TIMEZONE):
     """
-    Funkcja koryguje indeks czasu, przesuwając rekordy z godziny 00:00:00 na 23:59:59 poprzedniego dnia.
+    Funkcja normalizuje indeks czasu: każdy pomiar dostaje znacznik początku swojej godziny uśredniania.
+
+    Dzięki temu pomiar z 00:00 (koniec ostatniej godziny doby) trafia do poprzedniego dnia jako
+    godzina 23:00, a grupowanie po dniach i miesiącach nie wymaga dodatkowych poprawek.
+    Obcięcie do pełnych godzin i zmiana strefy czasowej odbywają się w tym samym kroku
+    (``hour_period_ids``), a indeks ``df.index.asi8 // NS_PER_HOUR`` daje numer godziny
+    gotowy do ułożenia danych w tablicę (dzień, godzina) - zob. ``compute_averages.to_day_hour``.
+    Przy ``target_tz='Europe/Warsaw'`` godzina zmiany czasu na zimowy występuje w indeksie dwa razy
+    (dwa różne pomiary); ``compute_averages.daily_sums`` uwzględnia oba.
 
     Args:
         df_dict (dict): Słownik ramek danych z DatetimeIndex zmapowanych do analizowanych lat.
+        target_tz (str, optional): strefa czasowa dób ('UTC', 'Europe/Warsaw'). Domyślnie czas z plików GIOŚ.
+        source_tz (str, optional): strefa czasowa plików GIOŚ, używana tylko razem z ``target_tz``.
 
     Returns:
         dict: Słownik z poprawionymi indeksami czasowymi.
     """
+    if target_tz is None:
+        source_tz = None
     for year, df in df_dict.items():
-        df.index = df.index - pd.to_timedelta((df.index.hour == 0).astype(int), unit='s')
+        period_end = hour_period_ids(df.index, source_tz, target_tz)
+        df.index = pd.DatetimeIndex(pd.to_datetime((period_end - 1) * NS_PER_HOUR, unit='ns'), name=df.index.name)
     return df_dict
 
 
+def split_calendar_years(df_dict):
+    """
+    Funkcja dba o to, żeby ramka roku zawierała tylko godziny z tego roku kalendarzowego.
+
+    Po zmianie strefy (np. ``target_tz='UTC'``) pierwszy pomiar z pliku roku Y (01:00 czasu GIOŚ)
+    zaczyna się 31 grudnia roku Y-1 o 23:00. Taka godzina trafia do ramki roku Y-1, jeśli ten rok
+    też jest wczytany (tylko dla stacji z tej ramki), a w przeciwnym razie jest pomijana - inaczej
+    kostki i średnie dla kolejnych lat liczyłyby ten sam dzień dwa razy.
+
+    Args:
+        df_dict (dict): Słownik {rok: df} z indeksem początków godzin uśredniania.
+
+    Returns:
+        dict: Słownik {rok: df} z godzinami wyłącznie z danego roku.
+    """
+    out = {}
+    for year, df in df_dict.items():
+        parts = [df[df.index.year == year]]
+        for other in (year - 1, year + 1):
+            if other in df_dict:
+                spill = df_dict[other][df_dict[other].index.year == year]
+                if len(spill):
+                    parts.append(spill.reindex(columns=df.columns))
+        out[year] = pd.concat(parts).sort_index() if len(parts) > 1 else parts[0]
+    return out
+
+
 def save_combined_data(df_dict, filename):
     """
     Funkcja scala dany ze wszytskich lat w jednę ramkę danych i zapisuje ją do pliku CSV.
@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import itertools
+import time
+
+import numpy as np
+
+"""
+load_test.py
+--------------
+Skrypt obciąża serwis z ``service.py`` równoległymi zapytaniami i mierzy opóźnienia (p50, p99).
+Każdy klient utrzymuje jedno połączenie keep-alive i wysyła kolejne zapytania z listy.
+"""
+
+DEFAULT_QUERIES = [
+    "/exceedances?norm=15",
+    "/exceedances?norm=25",
+    "/top?n=10&norm=15",
+    "/monthly?city=Warszawa&city=Katowice",
+]
+
+
+async def client(host, port, queries, n_requests, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for query in itertools.islice(itertools.cycle(queries), n_requests):
+            start = time.perf_counter()
+            writer.write(f"GET {query} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            await writer.drain()
+
+            length = 0
+            status = await reader.readline()
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+
+            if not status.startswith(b"HTTP/1.1 200"):
+                print(f"Błąd dla {query}: {status.decode().strip()}")
+    finally:
+        writer.close()
+
+
+async def run(host, port, queries, concurrency, n_requests):
+    """
+    Uruchamia ``concurrency`` klientów, z których każdy wysyła ``n_requests`` zapytań.
+
+    Returns:
+        tuple[np.ndarray, float]: Opóźnienia pojedynczych zapytań [s] i całkowity czas testu [s].
+    """
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(host, port, queries, n_requests, latencies) for _ in range(concurrency)
+    ))
+    return np.array(latencies), time.perf_counter() - start
+
+
+def main(host, port, concurrency, n_requests, queries):
+    latencies, total = asyncio.run(run(host, port, queries, concurrency, n_requests))
+    p50, p99 = np.percentile(latencies * 1000, [50, 99])
+    print(f"Zapytań: {len(latencies)} w {total:.2f} s ({len(latencies) / total:.0f} zapytań/s)")
+    print(f"p50: {p50:.2f} ms, p99: {p99:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure p50/p99 latency of the PM2.5 service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per client")
+    parser.add_argument("--query", action="append", help="Query path, may be repeated")
+    args = parser.parse_args()
+
+    main(args.host, args.port, args.concurrency, args.requests, args.query or DEFAULT_QUERIES)
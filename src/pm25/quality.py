@@ -0,0 +1,206 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+"""
+quality.py
+--------------
+Moduł wykrywa podejrzane pomiary godzinowe PM2.5 dla wszystkich stacji naraz:
+- wartości spoza dopuszczalnego zakresu (np. ujemne),
+- "zawieszone" czujniki, czyli długie serie identycznych odczytów,
+- pojedyncze skoki, odstające od sąsiednich godzin i od mediany okna o wielokrotność MAD
+  (można wyłączyć parametrem ``spikes``).
+
+Wynikiem jest maska flag (bity FLAG_*), a ``apply_qa`` zamienia oflagowane pomiary na NaN,
+więc wszystkie dalsze agregacje je pomijają.
+"""
+
+FLAG_RANGE = 1
+FLAG_FLATLINE = 2
+FLAG_SPIKE = 4
+
+QA_DEFAULTS = {
+    'min_value': 0.0,  # µg/m³
+    'max_value': 1000.0,  # µg/m³
+    'flatline_hours': 12,  # minimalna długość serii identycznych odczytów
+    'spikes': True,  # wykrywanie skoków
+    'spike_window': 24,  # szerokość okna mediany kroczącej (godziny)
+    'spike_k': 3.0,  # próg w jednostkach MAD (w skali logarytmicznej)
+    'spike_min_deviation': 75.0,  # minimalna nadwyżka (µg/m³) nad medianę i nad obie sąsiednie godziny
+}
+
+# współczynnik skalujący MAD do odchylenia standardowego dla rozkładu normalnego
+MAD_SCALE = 1.4826
+
+
+def range_flags(values, min_value=QA_DEFAULTS['min_value'], max_value=QA_DEFAULTS['max_value']):
+    """
+    Oznacza pomiary spoza zakresu [min_value, max_value].
+
+    Args:
+        values (np.ndarray): Macierz pomiarów (godziny x stacje).
+
+    Returns:
+        np.ndarray: Maska logiczna tego samego kształtu.
+    """
+    with np.errstate(invalid='ignore'):
+        return (values < min_value) | (values > max_value)
+
+
+def flatline_flags(values, min_run=QA_DEFAULTS['flatline_hours']):
+    """
+    Oznacza serie co najmniej ``min_run`` identycznych kolejnych odczytów (zawieszony czujnik).
+
+    Długości serii liczone są dla wszystkich stacji naraz: każda seria dostaje numer
+    (suma skumulowana zmian wartości), a ``np.bincount`` zlicza jej długość. Braki danych przerywają serię.
+
+    Args:
+        values (np.ndarray): Macierz pomiarów (godziny x stacje).
+        min_run (int, optional): Minimalna długość serii.
+
+    Returns:
+        np.ndarray: Maska logiczna tego samego kształtu.
+    """
+    n_rows, n_cols = values.shape
+    if n_rows == 0:
+        return np.zeros(values.shape, dtype=bool)
+
+    change = np.ones(values.shape, dtype=bool)
+    change[1:] = values[1:] != values[:-1]  # NaN != NaN, więc braki zawsze zaczynają nową serię
+
+    run_ids = np.cumsum(change.ravel(order='F')).reshape(values.shape, order='F') - 1
+    run_lengths = np.bincount(run_ids.ravel())
+    return (run_lengths[run_ids] >= min_run) & ~np.isnan(values)
+
+
+def window_median_mad(values, rows, cols, window):
+    """
+    Mediana i MAD (mediana odchyleń bezwzględnych od tej mediany) w wyśrodkowanym oknie
+    ``window`` godzin wokół wybranych pomiarów ``values[rows, cols]``.
+
+    Okna wycinane są tylko dla podanych pomiarów (jedna tablica kandydatów x okno), więc koszt
+    zależy od liczby kandydatów, a nie od rozmiaru całej macierzy. Braki danych są pomijane;
+    wynik jest NaN, gdy w oknie jest mniej niż ``window // 2`` pomiarów.
+
+    Args:
+        values (np.ndarray): Macierz pomiarów (godziny x stacje).
+        rows (np.ndarray): Numery godzin wybranych pomiarów.
+        cols (np.ndarray): Numery stacji wybranych pomiarów.
+        window (int): Szerokość okna w godzinach.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Mediany i MAD dla wybranych pomiarów.
+    """
+    hours = rows[:, None] + np.arange(window) - window // 2
+    inside = (hours >= 0) & (hours < len(values))
+    windows = np.where(inside, values[np.clip(hours, 0, len(values) - 1), cols[:, None]], np.nan)
+    windows[(~np.isnan(windows)).sum(axis=1) < max(1, window // 2)] = np.nan
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # okna bez pomiarów dają NaN
+        median = np.nanmedian(windows, axis=1)
+        mad = np.nanmedian(np.abs(windows - median[:, None]), axis=1)
+    return median, mad
+
+
+def spike_flags(values, window=QA_DEFAULTS['spike_window'], k=QA_DEFAULTS['spike_k'],
+                min_deviation=QA_DEFAULTS['spike_min_deviation']):
+    """
+    Oznacza skoki: pojedyncze pomiary wyższe o więcej niż ``min_deviation`` od obu sąsiednich godzin
+    i od mediany wyśrodkowanego okna ``window`` godzin, a jednocześnie odległe od tej mediany
+    o więcej niż ``k`` przeskalowanych MAD.
+
+    Warunek sąsiednich godzin jest tani i liczony dla całej macierzy; mediana i MAD (w skali
+    logarytmicznej, bo rozrzut stężeń rośnie z ich poziomem) liczone są tylko dla pomiarów, które
+    go spełniają (``window_median_mad``). Dzięki warunkowi sąsiadów początek i koniec kilkugodzinnego
+    epizodu smogowego nie są oznaczane.
+
+    Args:
+        values (np.ndarray): Macierz pomiarów (godziny x stacje).
+
+    Returns:
+        np.ndarray: Maska logiczna tego samego kształtu.
+    """
+    missing = np.full((1, values.shape[1]), np.nan)
+    neighbours = np.fmax(np.vstack([missing, values[:-1]]), np.vstack([values[1:], missing]))
+    with np.errstate(invalid='ignore'):
+        rows, cols = np.nonzero(values - neighbours > min_deviation)
+
+    log_values = np.log1p(np.clip(values, 0, None))
+    median, mad = window_median_mad(log_values, rows, cols, window)
+    with np.errstate(invalid='ignore'):
+        spike = (
+            (log_values[rows, cols] - median > k * MAD_SCALE * mad)
+            & (values[rows, cols] - np.expm1(median) > min_deviation)
+        )
+
+    flags = np.zeros(values.shape, dtype=bool)
+    flags[rows[spike], cols[spike]] = True
+    return flags
+
+
+def qa_flags(df, **params):
+    """
+    Liczy maskę flag jakości dla wszystkich stacji.
+
+    Args:
+        df (pd.DataFrame): Pomiary godzinowe (wiersze - godziny, kolumny - stacje).
+        **params: Nadpisania wartości z QA_DEFAULTS.
+
+    Returns:
+        pd.DataFrame: Flagi (uint8, suma bitów FLAG_RANGE, FLAG_FLATLINE, FLAG_SPIKE); 0 = pomiar poprawny.
+    """
+    params = {**QA_DEFAULTS, **params}
+    values = df.to_numpy(dtype=float)
+
+    in_range = range_flags(values, params['min_value'], params['max_value'])
+    # skoki i serie szukane są tylko wśród wartości z poprawnego zakresu
+    screened = np.where(in_range, np.nan, values)
+
+    flags = in_range.astype(np.uint8) * FLAG_RANGE
+    flags |= flatline_flags(screened, params['flatline_hours']).astype(np.uint8) * FLAG_FLATLINE
+    if params['spikes']:
+        flags |= spike_flags(
+            screened, params['spike_window'], params['spike_k'], params['spike_min_deviation']
+        ).astype(np.uint8) * FLAG_SPIKE
+
+    return pd.DataFrame(flags, index=df.index, columns=df.columns)
+
+
+def qa_summary(flags):
+    """
+    Liczba oflagowanych pomiarów według rodzaju flagi.
+
+    Returns:
+        dict: {'zakres': n, 'serie': n, 'skoki': n, 'razem': n}
+    """
+    values = flags.to_numpy()
+    return {
+        'zakres': int(((values & FLAG_RANGE) > 0).sum()),
+        'serie': int(((values & FLAG_FLATLINE) > 0).sum()),
+        'skoki': int(((values & FLAG_SPIKE) > 0).sum()),
+        'razem': int((values > 0).sum()),
+    }
+
+
+def apply_qa(df_dict, params=None):
+    """
+    Zamienia na NaN pomiary oflagowane przez ``qa_flags`` w ramkach wszystkich lat.
+
+    Args:
+        df_dict (dict): Słownik {rok: df} z oczyszczonymi pomiarami (po ``edit_df``).
+        params (dict, optional): Parametry kontroli jakości (klucze jak w QA_DEFAULTS).
+
+    Returns:
+        dict: Słownik {rok: df} z usuniętymi podejrzanymi pomiarami.
+    """
+    params = params or {}
+    out = {}
+    for year, df in df_dict.items():
+        flags = qa_flags(df, **params)
+        summary = qa_summary(flags)
+        print(f"Kontrola jakości {year}: odrzucono {summary['razem']} pomiarów "
+              f"(zakres: {summary['zakres']}, serie: {summary['serie']}, skoki: {summary['skoki']})")
+        out[year] = df.mask(flags.to_numpy() > 0)
+    return out
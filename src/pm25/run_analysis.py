@@ -1,55 +1,111 @@
 import argparse
+import sys
 from pathlib import Path
 import matplotlib.pyplot as plt
+import yaml
 
 from load_data import (
+    GIOS_ARCHIVE_URL,
     download_multiple_gios_archives,
     edit_df,
-    download_gios_metadata,
+    read_gios_metadata,
     create_code_map,
     multiindex_code_city,
-    correct_datetime_index
+    correct_datetime_index,
+    split_calendar_years,
+    prepare_station_voiv_map
 )
 
-from compute_averages import find_above_norm, monthly_mean
+from compute_averages import find_above_norm, group_exceedances
+from quality import apply_qa
+from summary_cube import build_cube, save_cube, monthly_means_table, monthly_city_means
 from visualizations import plot_average, bar_plots
+from sources import HttpSource, make_source
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from manifest import MANIFEST_NAME, hash_value, skip_if_unchanged, stage_code, write_manifest
+
+GIOS_IDS = {2006: '227', 2007: '228', 2008: '229', 2009: '230', 2010: '231', 2011: '232',
+            2012: '233', 2013: '234', 2014: '302', 2015: '236', 2016: '602', 2017: '262',
+            2018: '603', 2019: '322', 2020: '424', 2021: '486', 2022: '524', 2023: '564', 2024: '582'}
+FILENAMES = {2006: '2006_PM2.5_1g.xlsx', 2007: '2007_PM2.5_1g.xlsx', 2008: '2008_PM2.5_1g.xlsx',
+             2009: '2009_PM2.5_1g.xlsx', 2010: '2010_PM2.5_1g.xlsx', 2011: '2011_PM2.5_1g.xlsx',
+             2012: '2012_PM2.5_1g.xlsx', 2013: '2013_PM2.5_1g.xlsx', 2014: '2014_PM2.5_1g.xlsx',
+             2015: '2015_PM25_1g.xlsx', 2016: '2016_PM25_1g.xlsx', 2017: '2017_PM25_1g.xlsx',
+             2018: '2018_PM25_1g.xlsx', 2019: '2019_PM25_1g.xlsx', 2020: '2020_PM25_1g.xlsx',
+             2021: '2021_PM25_1g.xlsx', 2022: '2022_PM25_1g.xlsx', 2023: '2023_PM25_1g.xlsx',
+             2024: '2024_PM25_1g.xlsx'}
+
+METADATA_ID = '622'
+METADATA_URL = f"{GIOS_ARCHIVE_URL}{METADATA_ID}"
+
+# outputs written by analyze_year
+PM25_OUTPUTS = [
+    "exceedance_days.csv", "monthly_means.csv", "group_exceedances.csv", "summary_cube.csv",
+    "figures/exceedance_days.png", "figures/monthly_trends.png"
+]
+
+
+def pm25_stage(year, daily_norm, cities, outdir, station_groups=None, target_tz=None, source=None, qa=None):
+    """
+    Manifest path, input hashes (source archive, config slice, code version) and outputs of the PM2.5 stage.
+    """
+    if source is None:
+        source = HttpSource()
+    inputs = {
+        "archiwum": source.fingerprint(GIOS_IDS[year]),
+        "metadane": source.fingerprint(METADATA_ID),
+        "config": hash_value({
+            "year": year, "daily_norm": daily_norm, "cities": cities,
+            "station_groups": station_groups, "timezone": target_tz, "qa": qa
+        }),
+        "kod": stage_code("pm25"),
+    }
+    outputs = [str(Path(outdir) / name) for name in PM25_OUTPUTS]
+    return Path(outdir) / MANIFEST_NAME, inputs, outputs
+
+
+def load_pm25_data(years, target_tz=None, source=None, qa=None):
+    """
+    Downloads and cleans PM2.5 data for the given years.
+    Files come from source (see sources.make_source), by default straight from GIOŚ over HTTP.
+
+    Returns:
+        tuple[dict, pd.DataFrame]: {year: df} with (city, station) column MultiIndex and station metadata.
+    """
+    if source is None:
+        source = HttpSource()
+    raw = download_multiple_gios_archives(years, GIOS_IDS, FILENAMES, source=source)
+    metadata = read_gios_metadata(source.fetch(METADATA_ID))
+    return prepare_pm25_data(raw, metadata, target_tz, qa), metadata
+
+
+def prepare_pm25_data(raw, metadata, target_tz=None, qa=None):
+    """
+    Cleans raw GIOŚ sheets ({year: df}) and maps station codes to cities.
+    Days are counted in target_tz ('UTC', 'Europe/Warsaw') or in GIOŚ file time if None.
+    If qa (parameters from quality.QA_DEFAULTS) is given, flagged readings are set to NaN.
+    """
+    cleaned = edit_df(raw)
+    if qa is not None:
+        cleaned = apply_qa(cleaned, qa)
+    mapped = create_code_map(metadata, cleaned)
+    mapped = multiindex_code_city(mapped, metadata)
+    mapped = correct_datetime_index(mapped, target_tz)
+    return split_calendar_years(mapped)
 
-def main(year, daily_norm, cities, outdir):
 
-    # downloading the data
+def analyze_year(df, metadata, year, daily_norm, cities, outdir, station_groups=None):
+    """
+    Computes and saves all PM2.5 outputs (tables and figures) for a single year.
+    Only hours of that calendar year are used (see load_data.split_calendar_years).
+    """
+    df = df[df.index.year == year]
     outdir = Path(outdir)
     figdir = outdir / "figures"
     outdir.mkdir(parents=True, exist_ok=True)
     figdir.mkdir(parents=True, exist_ok=True)
 
-    years = [year]
-
-    gios_ids = {2006: '227', 2007: '228', 2008: '229', 2009: '230', 2010: '231', 2011: '232',
-                2012: '233', 2013: '234', 2014: '302', 2015: '236', 2016: '602', 2017: '262',
-                2018: '603', 2019: '322', 2020: '424', 2021: '486', 2022: '524', 2023: '564', 2024: '582'}
-    filenames = {2006: '2006_PM2.5_1g.xlsx', 2007: '2007_PM2.5_1g.xlsx', 2008: '2008_PM2.5_1g.xlsx',
-                 2009: '2009_PM2.5_1g.xlsx', 2010: '2010_PM2.5_1g.xlsx', 2011: '2011_PM2.5_1g.xlsx',
-                 2012: '2012_PM2.5_1g.xlsx', 2013: '2013_PM2.5_1g.xlsx', 2014: '2014_PM2.5_1g.xlsx',
-                 2015: '2015_PM25_1g.xlsx', 2016: '2016_PM25_1g.xlsx', 2017: '2017_PM25_1g.xlsx',
-                 2018: '2018_PM25_1g.xlsx', 2019: '2019_PM25_1g.xlsx', 2020: '2020_PM25_1g.xlsx',
-                 2021: '2021_PM25_1g.xlsx', 2022: '2022_PM25_1g.xlsx', 2023: '2023_PM25_1g.xlsx',
-                 2024: '2024_PM25_1g.xlsx'}
-    
-    if year not in gios_ids:
-        print(f"Brak danych dla roku {year} - pomijam przetwarzanie.")
-        return
-
-    raw = download_multiple_gios_archives(years, gios_ids, filenames)
-    cleaned = edit_df(raw)
-
-    metadata = download_gios_metadata("https://powietrze.gios.gov.pl/pjp/archives/downloadFile/622")
-    mapped = create_code_map(metadata, cleaned)
-    mapped = multiindex_code_city(mapped, metadata)
-    mapped = correct_datetime_index(mapped)
-    
-    # we have only one year, so no merging of the years
-    df = list(mapped.values())[0]
-
     # calculating exceedance days
     norms = find_above_norm(
         df,
@@ -69,11 +125,26 @@ def main(year, daily_norm, cities, outdir):
     plt.savefig(figdir / "exceedance_days.png", dpi=150)
     plt.close()
 
+    # exceedance days for groups of stations (voivodeships, cities, custom sets from config)
+    codes = df.columns.get_level_values("Kod stacji")
+    groupings = {
+        "województwo": prepare_station_voiv_map(metadata),
+        "miejscowość": dict(zip(codes, df.columns.get_level_values("Miejscowość"))),
+    }
+    groupings.update(station_groups or {})
+
+    groups = group_exceedances(df, groupings, years=[year], norm=daily_norm)
+    groups.to_csv(outdir / "group_exceedances.csv")
+
+    # summary cube (station x year x month x metric) read by the report and plots
+    cube = build_cube(df, norm=daily_norm)
+    save_cube(cube, outdir / "summary_cube.csv")
+
     # calulating monthly means
-    monthly = monthly_mean(df)
+    monthly = monthly_means_table(cube)
     monthly.to_csv(outdir / "monthly_means.csv", index=True)
 
-    monthly_city = monthly.T.groupby(level=0).mean().T
+    monthly_city = monthly_city_means(cube)
 
     # plotting average monthly PM2.5
     plot_average(
@@ -85,12 +156,49 @@ def main(year, daily_norm, cities, outdir):
     plt.savefig(figdir / "monthly_trends.png", dpi=150)
     plt.close()
 
+
+def main(year, daily_norm, cities, outdir, station_groups=None, target_tz=None, source=None, qa=None, force=False):
+
+    if year not in GIOS_IDS:
+        print(f"Brak danych dla roku {year} - pomijam przetwarzanie.")
+        return
+
+    # skip the whole stage if inputs and outputs match the manifest
+    manifest_path, inputs, outputs = pm25_stage(
+        year, daily_norm, cities, outdir, station_groups, target_tz, source, qa
+    )
+    skipped, reasons = skip_if_unchanged(manifest_path, f"pm25 {year}", inputs, outputs, force)
+    if skipped:
+        return
+
+    # downloading the data
+    mapped, metadata = load_pm25_data([year], target_tz, source, qa)
+
+    # we have only one year, so no merging of the years
+    df = list(mapped.values())[0]
+
+    analyze_year(df, metadata, year, daily_norm, cities, outdir, station_groups)
+
+    # fingerprint the inputs again: a replay source has only now recorded the archive
+    _, inputs, _ = pm25_stage(year, daily_norm, cities, outdir, station_groups, target_tz, source, qa)
+    write_manifest(manifest_path, f"pm25 {year}", inputs, outputs, reasons)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--year", type=int, required=True)
     parser.add_argument("--daily_norm", type=float, required=True)
     parser.add_argument("--cities", nargs="+", required=True)
     parser.add_argument("--outdir", required=True)
+    parser.add_argument("--config")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the manifest says nothing changed")
     args = parser.parse_args()
 
-    main(args.year, args.daily_norm, args.cities, args.outdir)
\ No newline at end of file
+    config = {"pm25": {}}
+    if args.config:
+        with open(args.config) as f:
+            config = yaml.safe_load(f)
+    pm25_config = config["pm25"]
+
+    main(args.year, args.daily_norm, args.cities, args.outdir,
+         pm25_config.get("station_groups"), pm25_config.get("timezone"),
+         make_source(config.get("sources")), pm25_config.get("qa"), args.force)
\ No newline at end of file
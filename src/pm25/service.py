@@ -0,0 +1,237 @@
+import argparse
+import asyncio
+import json
+from functools import lru_cache
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from compute_averages import monthly_mean, daily_mean
+from run_analysis import load_pm25_data
+from sources import make_source
+
+"""
+service.py
+--------------
+Moduł uruchamia lokalny serwis HTTP/JSON, który raz wczytuje oczyszczone dane PM2.5
+i trzyma w pamięci średnie dobowe oraz miesięczne, odpowiadając na zapytania bez
+ponownego pobierania i czyszczenia danych.
+
+Zapytania:
+- GET /exceedances?norm=15&year=2024: liczba dni przekroczenia normy dla każdej stacji
+- GET /monthly?city=Warszawa&city=Katowice&year=2024: średnie miesięczne dla miast
+- GET /top?n=10&year=2024&norm=15: N stacji z największą liczbą dni przekroczeń
+- GET /health: lata i liczba stacji wczytanych do pamięci
+"""
+
+ROUTES = {"/health", "/exceedances", "/monthly", "/top"}
+
+
+class PM25Store:
+    """
+    Dane PM2.5 trzymane w pamięci: średnie dobowe dla stacji oraz średnie miesięczne dla stacji i miast.
+
+    Args:
+        df_dict (dict): Słownik {rok: df} z DatetimeIndex i kolumnami MultiIndex ['Miejscowość', 'Kod stacji'].
+    """
+
+    def __init__(self, df_dict):
+        self.years = sorted(df_dict)
+        self.daily = {year: daily_mean(df) for year, df in df_dict.items()}
+        self.monthly = pd.concat([monthly_mean(df_dict[year]) for year in self.years])
+        self.monthly_city = self.monthly.T.groupby(level=0).mean().T
+
+    def exceedances(self, norm, year):
+        """
+        Liczba dni w roku ze średnią dobową powyżej normy.
+
+        Returns:
+            pd.Series: Liczba dni dla każdej stacji (MultiIndex ['Miejscowość', 'Kod stacji']).
+        """
+        return (self.daily[year] > norm).sum()
+
+    def monthly_means(self, cities, years):
+        """
+        Średnie miesięczne uśrednione po stacjach w mieście.
+
+        Returns:
+            dict: {miasto: {rok: lista średnich dla miesięcy 1-12}}; None dla miesięcy bez pomiarów.
+        """
+        out = {}
+        for city in cities:
+            series = self.monthly_city[city]
+            out[city] = {
+                year: [None if np.isnan(v) else v for v in series.loc[year].reindex(range(1, 13))]
+                for year in years
+            }
+        return out
+
+    def top_stations(self, n, year, norm):
+        """
+        N stacji z największą liczbą dni przekroczenia normy w danym roku.
+
+        Returns:
+            list[dict]: Rekordy z miastem, kodem stacji i liczbą dni.
+        """
+        top = self.exceedances(norm, year).nlargest(n)
+        return [
+            {"miejscowość": city, "kod_stacji": code, "dni": int(days)}
+            for (city, code), days in top.items()
+        ]
+
+
+class PM25Service:
+    """
+    Obsługa zapytań do ``PM25Store`` z pamięcią podręczną LRU wyników.
+
+    Args:
+        store (PM25Store): Dane trzymane w pamięci.
+        cache_size (int, optional): Maksymalna liczba zapamiętanych odpowiedzi. Domyślnie 1024.
+    """
+
+    def __init__(self, store, cache_size=1024):
+        self.store = store
+        self.query = lru_cache(maxsize=cache_size)(self._query)
+
+    def handle(self, path, params):
+        """
+        Odpowiada na zapytanie; parametry są normalizowane, żeby ta sama treść trafiała do jednej pozycji cache.
+
+        Returns:
+            tuple[int, bytes]: Kod statusu HTTP i odpowiedź JSON (404 - nieznana ścieżka,
+                400 - niepoprawne parametry, 500 - nieoczekiwany błąd).
+        """
+        if path not in ROUTES:
+            return 404, _error(f"Nieznana ścieżka: {path}")
+        key = tuple(sorted((name, tuple(sorted(values))) for name, values in params.items()))
+        try:
+            return 200, self.query(path, key)
+        except (KeyError, ValueError) as e:
+            return 400, _error(f"Niepoprawne zapytanie: {e}")
+        except Exception as e:
+            return 500, _error(f"Błąd serwisu: {type(e).__name__}: {e}")
+
+    def _query(self, path, key):
+        params = dict(key)
+        store = self.store
+
+        def single(name, default=None):
+            if name in params:
+                return params[name][0]
+            if default is None:
+                raise KeyError(name)
+            return default
+
+        if path == "/health":
+            body = {"years": store.years, "stations": int(store.monthly.shape[1])}
+        elif path == "/exceedances":
+            year = int(single("year", store.years[-1]))
+            days = store.exceedances(float(single("norm", 15)), year)
+            body = {
+                "year": year,
+                "stations": [
+                    {"miejscowość": city, "kod_stacji": code, "dni": int(n)}
+                    for (city, code), n in days.items()
+                ],
+            }
+        elif path == "/monthly":
+            years = [int(y) for y in params.get("year", store.years)]
+            body = store.monthly_means(params["city"], years)
+        elif path == "/top":
+            year = int(single("year", store.years[-1]))
+            body = store.top_stations(int(single("n", 10)), year, float(single("norm", 15)))
+
+        # NaN nie jest poprawnym JSON-em - braki danych muszą być już zamienione na None
+        try:
+            return json.dumps(body, ensure_ascii=False, allow_nan=False, default=_json_default).encode()
+        except ValueError as e:
+            raise RuntimeError(f"Odpowiedź nie jest poprawnym JSON-em: {e}") from e
+
+
+def _error(message):
+    return json.dumps({"error": message}, ensure_ascii=False).encode()
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(type(value))
+
+
+async def handle_connection(service, reader, writer):
+    """
+    Obsługuje połączenia HTTP/1.1 (z keep-alive); obliczenia wykonywane są w puli wątków,
+    żeby nie blokować pętli zdarzeń.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            if method != "GET":
+                status, body = 405, b'{"error": "Tylko GET"}'
+            else:
+                url = urlsplit(target)
+                status, body = await loop.run_in_executor(
+                    None, service.handle, url.path, parse_qs(url.query)
+                )
+
+            keep_alive = headers.get("connection", "").lower() != "close"
+            writer.write(
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service, host, port):
+    server = await asyncio.start_server(
+        lambda r, w: handle_connection(service, r, w), host, port
+    )
+    print(f"Serwis PM2.5 nasłuchuje na http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(config_path, host, port, cache_size):
+    with open(config_path) as f:
+        config = yaml.safe_load(f)
+
+    df_dict, _ = load_pm25_data(
+        config["years"], config["pm25"].get("timezone"), make_source(config.get("sources")),
+        config["pm25"].get("qa")
+    )
+    service = PM25Service(PM25Store(df_dict), cache_size=cache_size)
+    asyncio.run(serve(service, host, port))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON service with warm PM2.5 aggregates.")
+    parser.add_argument("--config", default="config/task4.yaml")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--cache_size", type=int, default=1024)
+    args = parser.parse_args()
+
+    main(args.config, args.host, args.port, args.cache_size)
@@ -0,0 +1,192 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from load_data import GIOS_ARCHIVE_URL, fetch_gios_archive
+
+"""
+sources.py
+--------------
+Moduł definiuje źródła plików GIOŚ (archiwa ZIP z pomiarami i plik z metadanymi stacji).
+Każde źródło zwraca zawartość pliku (bytes) dla klucza, którym jest identyfikator zasobu
+w archiwum GIOŚ (ostatnia część adresu .../downloadFile/<id>).
+
+Źródła:
+- HttpSource: pobieranie z powietrze.gios.gov.pl
+- LocalSource: pliki z lokalnego katalogu (<katalog>/<id>)
+- MirrorSource: lustro archiwum (np. magazyn obiektów), w razie braku pliku - serwer GIOŚ
+- ReplaySource: odtwarzanie zapisanych odpowiedzi; brakujące są pobierane i zapisywane
+
+Źródło wybiera się w sekcji ``sources`` pliku config/task4.yaml (zob. ``make_source``).
+"""
+
+SOURCE_MODES = ("http", "local", "mirror", "replay")
+# klucz sekcji ``sources`` wymagany w danym trybie
+REQUIRED_KEYS = {"local": "path", "mirror": "mirror_url", "replay": "path"}
+
+
+class Source:
+    """
+    Wspólna część źródeł: pobieranie wielu plików naraz.
+    """
+
+    def fetch(self, key):
+        raise NotImplementedError
+
+    def fingerprint(self, key):
+        """
+        Identyfikator zawartości pliku bez jego pobierania (do manifestów, zob. src/manifest.py).
+        """
+        raise NotImplementedError
+
+    def prefetch(self, keys, workers=8):
+        """
+        Pobiera równolegle wszystkie podane pliki (np. archiwa dla wszystkich lat z configu).
+
+        Args:
+            keys (list[str]): identyfikatory zasobów
+            workers (int, optional): liczba równoległych pobrań. Domyślnie 8.
+
+        Returns:
+            dict: Słownik {identyfikator: zawartość pliku}.
+        """
+        keys = list(dict.fromkeys(keys))
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(keys)))) as pool:
+            return dict(zip(keys, pool.map(self.fetch, keys)))
+
+
+class HttpSource(Source):
+    """
+    Pobieranie plików przez HTTP z archiwum GIOŚ (lub innego serwera o tym samym układzie adresów).
+
+    Args:
+        base_url (str, optional): adres, do którego doklejany jest identyfikator zasobu
+    """
+
+    def __init__(self, base_url=GIOS_ARCHIVE_URL):
+        self.base_url = base_url
+
+    def fetch(self, key):
+        return fetch_gios_archive(key, self.base_url)
+
+    def fingerprint(self, key):
+        # zasoby archiwum GIOŚ o danym identyfikatorze się nie zmieniają
+        return f"{self.base_url}{key}"
+
+
+class LocalSource(Source):
+    """
+    Odczyt plików z lokalnego katalogu, w którym plik ``<id>`` odpowiada zasobowi .../downloadFile/<id>.
+
+    Args:
+        path (str): katalog z plikami
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def fetch(self, key):
+        return (self.path / str(key)).read_bytes()
+
+    def fingerprint(self, key):
+        return _file_sha256(self.path / str(key))
+
+
+class MirrorSource(HttpSource):
+    """
+    Pobieranie z lustra archiwum GIOŚ; jeśli lustro nie ma pliku, pobiera go z serwera GIOŚ.
+
+    Args:
+        mirror_url (str): adres lustra, do którego doklejany jest identyfikator zasobu
+        fallback (Source, optional): źródło zapasowe. Domyślnie HttpSource().
+    """
+
+    def __init__(self, mirror_url, fallback=None):
+        super().__init__(mirror_url)
+        self.fallback = fallback or HttpSource()
+
+    def fetch(self, key):
+        try:
+            return super().fetch(key)
+        except requests.exceptions.RequestException as e:
+            print(f"Brak {key} w lustrze ({e}) - pobieram z GIOŚ.")
+            return self.fallback.fetch(key)
+
+    def fingerprint(self, key):
+        # lustro zawiera te same pliki co GIOŚ
+        return self.fallback.fingerprint(key)
+
+
+class ReplaySource(Source):
+    """
+    Odtwarzanie zapisanych odpowiedzi z katalogu (powtarzalne testy wydajności).
+    Pliki, których jeszcze nie ma, pobierane są ze źródła ``upstream`` i zapisywane.
+
+    Args:
+        path (str): katalog z nagraniami (ten sam układ co w LocalSource)
+        upstream (Source, optional): źródło dla brakujących plików. Domyślnie HttpSource().
+        record (bool, optional): czy zapisywać brakujące pliki. Jeśli False, brak pliku to błąd.
+    """
+
+    def __init__(self, path, upstream=None, record=True):
+        self.local = LocalSource(path)
+        self.upstream = upstream or HttpSource()
+        self.record = record
+
+    def fetch(self, key):
+        target = self.local.path / str(key)
+        if target.exists():
+            return target.read_bytes()
+        if not self.record:
+            raise FileNotFoundError(f"Brak nagrania {target}.")
+
+        content = self.upstream.fetch(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+        return content
+
+    def fingerprint(self, key):
+        if (self.local.path / str(key)).exists():
+            return self.local.fingerprint(key)
+        return self.upstream.fingerprint(key)
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_source(config=None):
+    """
+    Tworzy źródło na podstawie sekcji ``sources`` z pliku konfiguracyjnego.
+
+    Args:
+        config (dict, optional): klucze 'mode' (http, local, mirror, replay), 'path' (katalog dla local
+            i replay) oraz 'mirror_url' (dla mirror). Domyślnie (None) - HttpSource.
+
+    Returns:
+        Source: wybrane źródło
+
+    Raises:
+        ValueError: Jeśli tryb jest nieznany albo brakuje wymaganego klucza (REQUIRED_KEYS).
+    """
+    config = config or {}
+    mode = config.get("mode", "http")
+    if mode not in SOURCE_MODES:
+        raise ValueError(f"Nieznany tryb źródła danych: {mode} (dostępne: {', '.join(SOURCE_MODES)})")
+    required = REQUIRED_KEYS.get(mode)
+    if required is not None and not config.get(required):
+        raise ValueError(f"Tryb źródła danych '{mode}' wymaga ustawienia '{required}' w sekcji sources.")
+
+    if mode == "http":
+        return HttpSource()
+    if mode == "local":
+        return LocalSource(config["path"])
+    if mode == "mirror":
+        return MirrorSource(config["mirror_url"])
+    return ReplaySource(config["path"])
@@ -0,0 +1,217 @@
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+"""
+spatial.py
+--------------
+Moduł buduje indeks przestrzenny stacji pomiarowych ze współrzędnych zapisanych w metadanych GIOŚ
+(kolumny 'WGS84 φ N' i 'WGS84 λ E') i odpowiada na zapytania:
+- nearest: K najbliższych stacji dla punktu,
+- within_radius: wszystkie stacje w zadanym promieniu,
+- idw_grid: oszacowanie PM2.5 na siatce punktów metodą odwrotnych odległości (IDW),
+  dla wszystkich dni naraz.
+
+Stacje zapisane są jako punkty na sferze jednostkowej (x, y, z), więc odległość euklidesowa
+(cięciwa) rośnie monotonicznie z odległością po powierzchni Ziemi i zwykłe drzewo KD daje
+poprawnych sąsiadów. Jeśli zainstalowany jest pakiet scipy, używane jest ``scipy.spatial.cKDTree``;
+bez niego odległości liczone są macierzowo do wszystkich stacji (w Polsce jest ich kilkaset,
+więc to nadal szybkie).
+"""
+
+COORD_COLUMNS = ('WGS84 φ N', 'WGS84 λ E')
+EARTH_RADIUS_KM = 6371.0
+# odległość, poniżej której punkt siatki traktowany jest jak położenie stacji (IDW przyjmuje jej wartość)
+MIN_DISTANCE_KM = 1e-3
+
+if importlib.util.find_spec("scipy"):
+    from scipy.spatial import cKDTree
+else:
+    cKDTree = None
+
+
+def to_unit_xyz(lat, lon):
+    """
+    Zamienia szerokość i długość geograficzną (w stopniach) na punkty na sferze jednostkowej.
+
+    Returns:
+        np.ndarray: Tablica o kształcie (n, 3).
+    """
+    lat = np.radians(np.asarray(lat, dtype=float)).ravel()
+    lon = np.radians(np.asarray(lon, dtype=float)).ravel()
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def km_to_chord(km):
+    return 2 * np.sin(np.minimum(km, np.pi * EARTH_RADIUS_KM) / (2 * EARTH_RADIUS_KM))
+
+
+class StationIndex:
+    """
+    Indeks przestrzenny stacji pomiarowych.
+
+    Args:
+        codes (list[str]): Kody stacji.
+        lat (array-like): Szerokości geograficzne stacji (stopnie).
+        lon (array-like): Długości geograficzne stacji (stopnie).
+    """
+
+    def __init__(self, codes, lat, lon):
+        self.codes = pd.Index(codes, name='Kod stacji')
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.xyz = to_unit_xyz(self.lat, self.lon)
+        self.tree = cKDTree(self.xyz) if cKDTree is not None and len(self.codes) else None
+
+    @classmethod
+    def from_metadata(cls, metadata, codes=None, station_col='Kod stacji'):
+        """
+        Tworzy indeks z metadanych stacji (wynik ``download_gios_metadata``).
+
+        Args:
+            metadata (pd.DataFrame): Metadane z kolumnami kodu stacji i współrzędnych WGS84.
+            codes (list[str], optional): Tylko te stacje (np. kolumny ramki z pomiarami). Domyślnie wszystkie.
+            station_col (str, optional): Kolumna z kodem stacji.
+
+        Returns:
+            StationIndex: Indeks stacji, dla których znane są współrzędne.
+        """
+        lat_col, lon_col = COORD_COLUMNS
+        meta = metadata[[station_col, lat_col, lon_col]].drop_duplicates(subset=[station_col])
+        # współrzędne bywają zapisane tekstem z przecinkiem dziesiętnym
+        coords = meta[[lat_col, lon_col]].apply(
+            lambda col: pd.to_numeric(col.astype(str).str.replace(',', '.'), errors='coerce')
+        )
+        meta = meta.assign(**{lat_col: coords[lat_col], lon_col: coords[lon_col]}).dropna()
+        if codes is not None:
+            meta = meta[meta[station_col].isin(codes)]
+        return cls(meta[station_col].tolist(), meta[lat_col], meta[lon_col])
+
+    def __len__(self):
+        return len(self.codes)
+
+    def query(self, lat, lon, k=1):
+        """
+        K najbliższych stacji dla wielu punktów naraz.
+
+        Args:
+            lat (array-like): Szerokości geograficzne punktów.
+            lon (array-like): Długości geograficzne punktów.
+            k (int, optional): Liczba sąsiadów (najwyżej liczba stacji).
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Odległości w km i numery stacji, obie o kształcie (punkty, k),
+                posortowane od najbliższej.
+        """
+        points = to_unit_xyz(lat, lon)
+        k = min(k, len(self))
+
+        if self.tree is not None:
+            chord, idx = self.tree.query(points, k=k)
+            chord, idx = chord.reshape(len(points), k), idx.reshape(len(points), k)
+        else:
+            all_chords = np.linalg.norm(points[:, None, :] - self.xyz[None, :, :], axis=2)
+            idx = np.argsort(all_chords, axis=1, kind='stable')[:, :k]
+            chord = np.take_along_axis(all_chords, idx, axis=1)
+        return chord_to_km(chord), idx
+
+    def nearest(self, lat, lon, k=1):
+        """
+        K najbliższych stacji dla jednego punktu.
+
+        Returns:
+            pd.Series: Odległości w km indeksowane kodem stacji, od najbliższej.
+        """
+        dist, idx = self.query(lat, lon, k)
+        return pd.Series(dist[0], index=self.codes[idx[0]], name='odległość_km')
+
+    def within_radius(self, lat, lon, radius_km):
+        """
+        Wszystkie stacje w promieniu ``radius_km`` od punktu.
+
+        Returns:
+            pd.Series: Odległości w km indeksowane kodem stacji, od najbliższej.
+        """
+        point = to_unit_xyz(lat, lon)
+        radius = km_to_chord(radius_km)
+
+        if self.tree is not None:
+            idx = np.asarray(self.tree.query_ball_point(point[0], radius), dtype=int)
+        else:
+            idx = np.flatnonzero(np.linalg.norm(self.xyz - point, axis=1) <= radius)
+
+        dist = chord_to_km(np.linalg.norm(self.xyz[idx] - point, axis=1))
+        order = np.argsort(dist, kind='stable')
+        return pd.Series(dist[order], index=self.codes[idx[order]], name='odległość_km')
+
+    def grid(self, n_lat=60, n_lon=80, margin=0.2):
+        """
+        Regularna siatka obejmująca wszystkie stacje (z marginesem w stopniach).
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Szerokości (n_lat) i długości (n_lon) geograficzne węzłów.
+        """
+        lats = np.linspace(self.lat.min() - margin, self.lat.max() + margin, n_lat)
+        lons = np.linspace(self.lon.min() - margin, self.lon.max() + margin, n_lon)
+        return lats, lons
+
+    def idw_weights(self, lat, lon, power=2.0, k=None, max_km=None):
+        """
+        Macierz wag IDW (punkty x stacje): waga stacji to 1 / odległość**power, a zero dla stacji
+        spoza ``k`` najbliższych lub dalszych niż ``max_km``.
+        """
+        n_points = np.size(lat)
+        dist, idx = self.query(lat, lon, k=len(self) if k is None else k)
+        with np.errstate(divide='ignore'):
+            w = np.maximum(dist, MIN_DISTANCE_KM) ** -power
+        if max_km is not None:
+            w[dist > max_km] = 0.0
+
+        weights = np.zeros((n_points, len(self)))
+        np.put_along_axis(weights, idx, w, axis=1)
+        return weights
+
+    def idw_grid(self, daily, lats, lons, power=2.0, k=None, max_km=None):
+        """
+        Oszacowanie PM2.5 metodą odwrotnych odległości w węzłach siatki, dla wszystkich dni naraz.
+
+        Dla każdego dnia brane są tylko stacje z pomiarem, więc brak danych na stacji nie daje NaN
+        w całym otoczeniu - zmienia się tylko rozkład wag. Wszystkie dni liczone są dwoma mnożeniami
+        macierzy (sumy ważone wartości i sumy wag).
+
+        Args:
+            daily (pd.DataFrame): Średnie dobowe (wiersze - dni, kolumny - kody stacji lub MultiIndex
+                z poziomem 'Kod stacji'), np. wynik ``daily_mean``.
+            lats (np.ndarray): Szerokości geograficzne wierszy siatki.
+            lons (np.ndarray): Długości geograficzne kolumn siatki.
+            power (float, optional): Wykładnik odległości. Domyślnie 2.
+            k (int, optional): Liczba najbliższych stacji branych pod uwagę. Domyślnie wszystkie.
+            max_km (float, optional): Maksymalna odległość stacji od węzła.
+
+        Returns:
+            np.ndarray: Tablica (dni, len(lats), len(lons)); NaN tam, gdzie żadna stacja z wagą nie miała pomiaru.
+        """
+        codes = daily.columns
+        if isinstance(codes, pd.MultiIndex):
+            codes = codes.get_level_values('Kod stacji')
+        positions = self.codes.get_indexer(codes)
+        known = positions >= 0
+
+        # wartości w kolejności stacji z indeksu; stacje bez pomiarów w ramce zostają NaN
+        values = np.full((len(daily), len(self)), np.nan)
+        values[:, positions[known]] = daily.to_numpy(dtype=float)[:, known]
+        valid = ~np.isnan(values)
+
+        grid_lat, grid_lon = np.meshgrid(lats, lons, indexing='ij')
+        weights = self.idw_weights(grid_lat.ravel(), grid_lon.ravel(), power, k, max_km)
+
+        sums = np.where(valid, values, 0.0) @ weights.T  # dni x węzły
+        norm = valid.astype(float) @ weights.T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            estimate = np.where(norm > 0, sums / norm, np.nan)
+        return estimate.reshape(len(daily), len(lats), len(lons))
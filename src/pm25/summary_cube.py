@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+from compute_averages import daily_sums
+
+"""
+summary_cube.py
+--------------
+Moduł tworzy i odczytuje kostkę podsumowań PM2.5: dla każdej stacji, roku i miesiąca
+zapisuje kilka miar (średnia, liczba godzin z pomiarem, liczba dni przekroczenia normy,
+liczba dni z pomiarem). Kostka jest mała (stacje x 12 wierszy na rok), więc raport,
+wykresy i doraźne zapytania czytają ją zamiast danych godzinowych.
+
+Plik CSV zaczyna się wierszem ``# summary_cube v<wersja> norm=<norma>``; przy zmianie
+układu kostki należy zwiększyć CUBE_VERSION.
+"""
+
+CUBE_VERSION = 1
+CUBE_INDEX = ['Miejscowość', 'Kod stacji', 'rok', 'miesiąc']
+CUBE_METRICS = ['srednia', 'n_godzin', 'dni_powyzej_normy', 'n_dni']
+
+
+def build_cube(df, norm=15):
+    """
+    Funkcja liczy kostkę podsumowań z dobowych sum i liczb pomiarów (``daily_sums``).
+
+    Średnia miesięczna to średnia ze wszystkich pomiarów godzinowych w miesiącu (jak ``monthly_mean``),
+    a dzień przekroczenia to dzień, w którym średnia dobowa przekroczyła normę (jak ``find_above_norm``).
+
+    Args:
+        df (pd.DataFrame): Pomiary godzinowe z indeksem początków godzin uśredniania
+            i kolumnami MultiIndex ['Miejscowość', 'Kod stacji'].
+        norm (float, optional): Dobowa norma PM2.5. Domyślnie 15 µg/m³.
+
+    Returns:
+        pd.DataFrame: Kostka z MultiIndexem CUBE_INDEX i kolumnami CUBE_METRICS; norma zapisana w ``attrs['norm']``.
+    """
+    hour_sums, hour_counts, days = daily_sums(df)  # dni x stacje
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily = np.where(hour_counts > 0, hour_sums / hour_counts, np.nan)
+        above = daily > norm
+
+    # macierz wskaźnikowa dzień -> (rok, miesiąc)
+    month_keys = days.year * 12 + days.month - 1
+    months, month_codes = np.unique(month_keys, return_inverse=True)
+    indicator = np.zeros((len(days), len(months)))
+    indicator[np.arange(len(days)), month_codes] = 1.0
+
+    sums = indicator.T @ hour_sums  # miesiące x stacje
+    counts = indicator.T @ hour_counts
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    metrics = {
+        'srednia': means,
+        'n_godzin': counts.astype(int),
+        'dni_powyzej_normy': (indicator.T @ above).astype(int),
+        'n_dni': (indicator.T @ (hour_counts > 0)).astype(int),
+    }
+
+    # wiersze: stacja (w kolejności kolumn ramki) x miesiąc
+    n_months, n_stations = means.shape
+    index = pd.MultiIndex.from_arrays(
+        [
+            np.repeat(df.columns.get_level_values('Miejscowość'), n_months),
+            np.repeat(df.columns.get_level_values('Kod stacji'), n_months),
+            np.tile(months // 12, n_stations),
+            np.tile(months % 12 + 1, n_stations),
+        ],
+        names=CUBE_INDEX
+    )
+    out = pd.DataFrame({name: values.T.ravel() for name, values in metrics.items()}, index=index)
+    out.attrs['norm'] = norm
+    return out
+
+
+def save_cube(cube, path):
+    """
+    Zapisuje kostkę do pliku CSV poprzedzonego wierszem z wersją i normą.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"# summary_cube v{CUBE_VERSION} norm={cube.attrs.get('norm')}\n")
+        cube.to_csv(f)
+
+
+def load_cube(paths):
+    """
+    Wczytuje jedną lub kilka kostek (np. dla kolejnych lat) i łączy je w jedną.
+
+    Args:
+        paths (str | list[str]): Ścieżki do plików summary_cube.csv.
+
+    Returns:
+        pd.DataFrame: Połączona kostka.
+
+    Raises:
+        ValueError: Jeśli plik nie jest kostką w obsługiwanej wersji albo kostki policzono dla różnych norm.
+    """
+    if isinstance(paths, (str, bytes)) or not hasattr(paths, '__iter__'):
+        paths = [paths]
+
+    cubes = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            header = f.readline().split()
+            if header[:2] != ['#', 'summary_cube'] or header[2] != f"v{CUBE_VERSION}":
+                raise ValueError(f"{path}: nieobsługiwana wersja kostki ({' '.join(header[1:3])}).")
+            cube = pd.read_csv(f, index_col=list(range(len(CUBE_INDEX))))
+        cube.attrs['norm'] = float(header[3].split('=')[1])
+        cubes.append(cube)
+
+    norms = {cube.attrs['norm'] for cube in cubes}
+    if len(norms) > 1:
+        raise ValueError(f"Kostki policzone dla różnych norm: {sorted(norms)} - przelicz je z jedną normą.")
+
+    out = pd.concat(cubes)
+    out.attrs['norm'] = norms.pop()
+    return out
+
+
+def exceedance_table(cube, level='Miejscowość'):
+    """
+    Liczba dni przekroczenia normy zsumowana po stacjach (dla level='Miejscowość') i miesiącach.
+
+    Returns:
+        pd.DataFrame: Wiersze to wartości poziomu ``level``, kolumny to lata.
+    """
+    return cube['dni_powyzej_normy'].groupby(level=[level, 'rok']).sum().unstack('rok')
+
+
+def monthly_means_table(cube, years=None):
+    """
+    Średnie miesięczne w układzie pliku monthly_means.csv (wiersze ['rok', 'miesiąc'],
+    kolumny ['Miejscowość', 'Kod stacji'] w kolejności z kostki).
+
+    Args:
+        cube (pd.DataFrame): Kostka podsumowań.
+        years (list[int], optional): Lata do wybrania. Domyślnie wszystkie.
+
+    Returns:
+        pd.DataFrame: Średnie miesięczne dla stacji.
+    """
+    means = cube['srednia']
+    if years is not None:
+        means = means[means.index.get_level_values('rok').isin(years)]
+
+    table = means.unstack(['Miejscowość', 'Kod stacji'])
+    stations = means.index.droplevel(['rok', 'miesiąc']).unique()
+    return table.reindex(columns=stations)
+
+
+def monthly_city_means(cube, years=None):
+    """
+    Średnie miesięczne dla miast (średnia ze średnich stacji w mieście).
+
+    Returns:
+        pd.DataFrame: Wiersze ['rok', 'miesiąc'], kolumny to miasta.
+    """
+    return monthly_means_table(cube, years).T.groupby(level=0).mean().T
@@ -134,8 +134,42 @@ def bar_plots(norms_df, year, show=True):
     plt.legend(title='Rok')
     plt.tight_layout()
     if show:
-        plt.show()  
-    return 
-    
+        plt.show()
+    return
+
+def plot_map(estimate, lats, lons, station_index=None, title='Oszacowanie PM2.5 (IDW)', show=True):
+    """
+    Funkcja rysuje mapę oszacowanego stężenia PM2.5 na siatce (np. jeden dzień lub średnia z wyniku
+    ``StationIndex.idw_grid``) z zaznaczonymi stacjami pomiarowymi.
+
+    Args:
+        estimate (np.ndarray): Wartości w węzłach siatki o kształcie (len(lats), len(lons)).
+        lats (np.ndarray): Szerokości geograficzne wierszy siatki.
+        lons (np.ndarray): Długości geograficzne kolumn siatki.
+        station_index (StationIndex, optional): Indeks stacji, których położenie zostanie zaznaczone.
+        title (str, optional): Tytuł wykresu.
+
+    Returns:
+        None
+    """
+    fig, ax = plt.subplots(figsize=(8, 7))
+    mesh = ax.pcolormesh(lons, lats, estimate, cmap='coolwarm', shading='auto')
+    fig.colorbar(mesh, ax=ax, label='PM2.5 (µg/m³)')
+
+    if station_index is not None:
+        ax.scatter(station_index.lon, station_index.lat, s=12, c='black', marker='^', label='stacje')
+        ax.legend(frameon=False, loc='lower left')
+
+    ax.set_xlabel('Długość geograficzna (°E)')
+    ax.set_ylabel('Szerokość geograficzna (°N)')
+    # w szerokościach Polski 1° długości to ok. 0.62° szerokości
+    ax.set_aspect(1 / np.cos(np.radians(np.mean(lats))))
+    ax.set_title(title)
+    fig.tight_layout()
+
+    if show:
+        plt.show()
+    return
+
 if __name__ == "__main__":
     pass
\ No newline at end of file
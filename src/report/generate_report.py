@@ -1,15 +1,24 @@
 import argparse
+import sys
 import yaml
 import pandas as pd
 from pathlib import Path
 from collections import Counter
 import matplotlib.pyplot as plt
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "pm25"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from summary_cube import load_cube, exceedance_table, monthly_means_table
+from manifest import MANIFEST_NAME, hash_file, hash_value, skip_if_unchanged, stage_code, write_manifest
+
+TOP_WORDS_FIG = "results/literature/top_words.png"
+
 # parse command-line arguments
 def parse_args():
     p = argparse.ArgumentParser()
     p.add_argument("--config", required=True)
     p.add_argument("--output", required=True)
+    p.add_argument("--force", action="store_true", help="Rebuild even if the manifest says nothing changed")
     return p.parse_args()
 
 # Zwraca n najczęstszych słów w liście tytułów
@@ -31,6 +40,30 @@ def main():
     with open(args.config) as f:
         config = yaml.safe_load(f)
 
+    # skip if none of the result files, the config slice or the code changed
+    manifest_path, inputs, outputs = report_stage(config, args.output)
+    skipped, reasons = skip_if_unchanged(manifest_path, "report", inputs, outputs, args.force)
+    if skipped:
+        return
+
+    build_report(config, args.output)
+    write_manifest(manifest_path, "report", inputs, outputs, reasons)
+
+# Manifest path, input hashes (result files read by the report, config slice, code version) and outputs
+def report_stage(config, output):
+    years = config["years"]
+    files = [f"results/pm25/{y}/summary_cube.csv" for y in years]
+    for y in years:
+        files += [f"results/literature/{y}/{name}" for name in
+                  ("pubmed_papers.csv", "summary_by_year.csv", "top_journals.csv")]
+
+    inputs = {path: hash_file(path) for path in files}
+    inputs["config"] = hash_value({"years": years, "cities": config["pm25"]["cities"]})
+    inputs["kod"] = stage_code("report")
+    return Path(output).parent / MANIFEST_NAME, inputs, [output, TOP_WORDS_FIG]
+
+# Builds the markdown report from the PM2.5 and literature results
+def build_report(config, output):
     years = config["years"]
     cities = config['pm25']["cities"]
 
@@ -51,16 +84,12 @@ def main():
         "przekroczyło obowiązującą normę.\n"
     )
 
-    # For each year, read the exceedance days and combine
-    pm25_cols = []
-    for y in years:
-        df = pd.read_csv(f"results/pm25/{y}/exceedance_days.csv")
-        df = df.groupby("Miejscowość").sum()
-        df = df.rename(columns={"exceedance_days": str(y)})
-        df = df.drop(columns=["Kod stacji"])
-        pm25_cols.append(df)
+    # Summary cubes of all years (station x year x month) - no hourly data needed
+    cube = load_cube([f"results/pm25/{y}/summary_cube.csv" for y in years])
 
-    result = pd.concat(pm25_cols, axis=1)
+    # Exceedance days per city and year
+    result = exceedance_table(cube, level="Miejscowość").reindex(columns=years)
+    result.columns = result.columns.map(str)
 
     out.append(result.to_markdown(index=True))
     out.append("\n")
@@ -77,9 +106,9 @@ def main():
     # For each year, in clude monthly means and plots
     for y in years:
         out.append(f"### Rok {y}\n")
-        monthly = pd.read_csv(f"results/pm25/{y}/monthly_means.csv", header=[0, 1])
+        monthly = monthly_means_table(cube, years=[y]).reset_index()
         cols = monthly.columns
-        new_cols = [('','') if i==1 else col for i, col in enumerate(cols)]
+        new_cols = [('Miejscowość', 'Kod stacji'), ('', '')] + list(cols[2:])
         monthly.columns = pd.MultiIndex.from_tuples(new_cols)
 
         out.append(monthly.to_markdown(index=False))
@@ -131,7 +160,7 @@ def main():
     df_compare.plot.bar(figsize=(12, 6))
     plt.ylabel("Liczba wystąpień")
     plt.title("Top słowa w tytułach publikacji")
-    fig_path = Path("results/literature/top_words.png")
+    fig_path = Path(TOP_WORDS_FIG)
     fig_path.parent.mkdir(parents=True, exist_ok=True)
     plt.tight_layout()
     plt.savefig(fig_path)
@@ -139,7 +168,7 @@ def main():
 
     out.append(f"![Top słowa](literature/top_words.png)\n")
 
-    Path(args.output).write_text("\n".join(out), encoding="utf-8")
+    Path(output).write_text("\n".join(out), encoding="utf-8")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
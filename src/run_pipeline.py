@@ -0,0 +1,212 @@
+import argparse
+import asyncio
+import multiprocessing
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import yaml
+
+"""
+run_pipeline.py
+--------------
+Asynchronous end-to-end runner, an alternative to the Snakemake DAG.
+
+Network fetches (GIOŚ archives and metadata, PubMed esearch/esummary) for every year run
+concurrently in threads, while parsing, cleaning, aggregation and plotting run in a process
+pool as soon as their own inputs have arrived. The report is generated the moment the last
+artifact it depends on is written. Stages whose inputs and outputs match their manifest
+(see manifest.py) are skipped unless --force is given.
+"""
+
+SRC = Path(__file__).resolve().parent
+sys.path.insert(0, str(SRC))
+for sub in ("pm25", "literature", "report"):
+    sys.path.insert(0, str(SRC / sub))
+
+from load_data import read_gios_archive, read_gios_metadata
+from run_analysis import GIOS_IDS, FILENAMES, METADATA_ID, prepare_pm25_data, analyze_year, pm25_stage
+from sources import make_source
+from pubmed_fetch import fetch_pubmed_from_source, save_outputs, pubmed_stage
+from generate_report import build_report, report_stage
+from manifest import skip_if_unchanged, write_manifest
+
+
+def _warm_up():
+    # worker processes import pandas/matplotlib while the downloads are still running
+    return None
+
+
+def process_pm25_year(year, content, metadata, daily_norm, cities, outdir, station_groups, target_tz, qa):
+    """
+    CPU-bound part of the PM2.5 stage for a single year (runs in a worker process).
+    """
+    raw = {year: read_gios_archive(content, year, FILENAMES[year])}
+    df = prepare_pm25_data(raw, metadata, target_tz, qa)[year]
+    analyze_year(df, metadata, year, daily_norm, cities, outdir, station_groups)
+    return outdir
+
+
+async def pm25_year(pool, source, year, metadata_task, pm25_config, force=False):
+    loop = asyncio.get_running_loop()
+    outdir = f"results/pm25/{year}"
+    args = (
+        pm25_config["daily_norm"], pm25_config["cities"], outdir,
+        pm25_config.get("station_groups"), pm25_config.get("timezone")
+    )
+    manifest_path, inputs, outputs = await asyncio.to_thread(
+        pm25_stage, year, *args, source, pm25_config.get("qa")
+    )
+    skipped, reasons = await asyncio.to_thread(
+        skip_if_unchanged, manifest_path, f"pm25 {year}", inputs, outputs, force
+    )
+    if skipped:
+        return f"pm25 {year} (bez zmian)"
+
+    # the metadata download overlaps with this year's archive download
+    metadata_task.start()
+    content = await asyncio.to_thread(source.fetch, GIOS_IDS[year])
+    metadata = await metadata_task
+    await loop.run_in_executor(
+        pool, process_pm25_year, year, content, metadata, *args, pm25_config.get("qa")
+    )
+    # inputs are fingerprinted again, since a replay source has only now recorded the archive
+    _, inputs, _ = await asyncio.to_thread(pm25_stage, year, *args, source, pm25_config.get("qa"))
+    await asyncio.to_thread(write_manifest, manifest_path, f"pm25 {year}", inputs, outputs, reasons)
+    return f"pm25 {year}"
+
+
+async def pubmed_year(pool, year, pubmed_config, sources_config, force=False):
+    loop = asyncio.get_running_loop()
+    outdir = f"results/literature/{year}"
+    manifest_path, inputs, outputs = await asyncio.to_thread(
+        pubmed_stage, year, pubmed_config, sources_config, outdir
+    )
+    skipped, reasons = await asyncio.to_thread(
+        skip_if_unchanged, manifest_path, f"pubmed {year}", inputs, outputs, force
+    )
+    if skipped:
+        return f"pubmed {year} (bez zmian)"
+
+    papers = await asyncio.to_thread(
+        fetch_pubmed_from_source,
+        year=year,
+        query=pubmed_config["query"],
+        email=pubmed_config["email"],
+        retmax=pubmed_config["limit"],
+        sources=sources_config,
+    )
+    await loop.run_in_executor(pool, save_outputs, papers, outdir)
+    _, inputs, _ = await asyncio.to_thread(pubmed_stage, year, pubmed_config, sources_config, outdir)
+    await asyncio.to_thread(write_manifest, manifest_path, f"pubmed {year}", inputs, outputs, reasons)
+    return f"pubmed {year}"
+
+
+class LazyTask:
+    """
+    Awaitable that starts its coroutine on first start() or await and shares the result
+    between awaiters.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.task = None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.factory())
+        return self.task
+
+    def __await__(self):
+        return self.start().__await__()
+
+
+async def load_metadata(pool, source):
+    loop = asyncio.get_running_loop()
+    content = await asyncio.to_thread(source.fetch, METADATA_ID)
+    return await loop.run_in_executor(pool, read_gios_metadata, content)
+
+
+async def run(config, output, workers, force=False):
+    """
+    Runs all stages for the years in config and builds the report.
+
+    Returns:
+        float: Wall time in seconds.
+    """
+    start = time.perf_counter()
+    years = config["years"]
+    source = make_source(config.get("sources"))
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        loop = asyncio.get_running_loop()
+        for _ in range(workers):
+            loop.run_in_executor(pool, _warm_up)
+
+        # metadata is fetched only if some PM2.5 stage actually has to be rebuilt
+        metadata_task = LazyTask(lambda: load_metadata(pool, source))
+        tasks = [pm25_year(pool, source, y, metadata_task, config["pm25"], force) for y in years if y in GIOS_IDS]
+        tasks += [pubmed_year(pool, y, config["pubmed"], config.get("sources"), force) for y in years]
+
+        for skipped in (y for y in years if y not in GIOS_IDS):
+            print(f"Brak danych dla roku {skipped} - pomijam przetwarzanie.")
+
+        # report artifacts as soon as each of them is ready
+        for finished in asyncio.as_completed(tasks):
+            name = await finished
+            print(f"[{time.perf_counter() - start:7.2f} s] gotowe: {name}")
+
+        manifest_path, inputs, outputs = await asyncio.to_thread(report_stage, config, output)
+        skipped, reasons = await asyncio.to_thread(
+            skip_if_unchanged, manifest_path, "report", inputs, outputs, force
+        )
+        if not skipped:
+            await loop.run_in_executor(pool, build_report, config, output)
+            await asyncio.to_thread(write_manifest, manifest_path, "report", inputs, outputs, reasons)
+
+    wall = time.perf_counter() - start
+    print(f"[{wall:7.2f} s] gotowe: raport {output}")
+    return wall
+
+
+def run_snakemake(cores):
+    """
+    Runs the Snakemake workflow from scratch and returns its wall time in seconds (or None).
+    """
+    start = time.perf_counter()
+    try:
+        subprocess.run(["snakemake", "--cores", str(cores), "--forceall"], check=True)
+    except (FileNotFoundError, subprocess.CalledProcessError) as e:
+        print(f"Nie udało się uruchomić Snakemake: {e}")
+        return None
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the whole pipeline with overlapping I/O and compute.")
+    parser.add_argument("--config", default="config/task4.yaml")
+    parser.add_argument("--output", default="results/report_task4.md")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--force", action="store_true", help="Rebuild every stage, ignoring the manifests")
+    parser.add_argument("--compare_snakemake", action="store_true",
+                        help="Also run 'snakemake --forceall' and compare wall times (implies --force)")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+
+    # the comparison with 'snakemake --forceall' is only fair if nothing is skipped here either
+    wall = asyncio.run(run(config, args.output, args.workers, args.force or args.compare_snakemake))
+
+    if args.compare_snakemake:
+        snakemake_wall = run_snakemake(args.workers)
+        if snakemake_wall is not None:
+            print(f"asyncio: {wall:.2f} s, snakemake: {snakemake_wall:.2f} s "
+                  f"(przyspieszenie x{snakemake_wall / wall:.2f})")
+
+
+if __name__ == "__main__":
+    main()
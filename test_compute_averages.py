@@ -0,0 +1,147 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.pm25.compute_averages import (group_exceedances, voivodeship_exceedances, to_day_hour, daily_mean,
+                                       monthly_mean, find_above_norm)
+from src.pm25.load_data import correct_datetime_index, split_calendar_years
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src" / "pm25"))
+from summary_cube import build_cube, save_cube, load_cube, exceedance_table, monthly_means_table
+
+
+def make_df():
+    index = pd.date_range("2024-01-01", periods=24 * 4, freq="h")
+    columns = pd.MultiIndex.from_arrays(
+        [["A", "A", "B"], ["s1", "s2", "s3"]],
+        names=["Miejscowość", "Kod stacji"]
+    )
+    values = np.full((len(index), 3), 10.0)
+    values[:24, 0] = 30.0      # dzień 1: s1 = 30, s2 = 10 -> średnia 20
+    values[24:48, 1] = np.nan  # dzień 2: s2 brak danych -> średnia z samej s1 = 10
+    values[48:72, 2] = 40.0    # dzień 3: s3 = 40
+    return pd.DataFrame(values, index=index, columns=columns)
+
+
+# Średnia w grupie pomija braki danych, a każdy podział liczony jest w jednym wywołaniu
+def test_group_exceedances_multiple_groupings():
+    df = make_df()
+    groups = group_exceedances(
+        df,
+        {"woj": {"s1": "X", "s2": "X", "s3": "Y"}, "zbiór": ["s2", "s3"]},
+        years=[2024],
+        norm=15
+    )
+
+    assert groups.loc[("woj", "X"), 2024] == 1
+    assert groups.loc[("woj", "Y"), 2024] == 1
+    assert groups.loc[("zbiór", "zbiór"), 2024] == 1  # dzień 3: (10 + 40) / 2 = 25
+
+
+# Stacje bez przypisanego województwa są pomijane
+def test_voivodeship_exceedances_skips_unmapped_stations():
+    out = voivodeship_exceedances(make_df(), {"s1": "X"}, years=[2024, 2025], norm=15)
+
+    assert list(out.index) == ["X"]
+    assert out.loc["X", 2024] == 1
+    assert out.loc["X", 2025] == 0
+
+
+# Kompletny zakres godzin układany jest w tablicę (dzień, godzina) bez kopiowania, a luki uzupełniane NaN
+def test_to_day_hour_view_and_gaps():
+    df = make_df()
+    cube, days = to_day_hour(df)
+
+    assert cube.shape == (4, 24, 3)
+    assert np.shares_memory(cube, df.to_numpy())
+    assert list(days) == list(pd.date_range("2024-01-01", periods=4, freq="D"))
+
+    cube, _ = to_day_hour(df.drop(df.index[5]))
+    assert np.isnan(cube[0, 5]).all()
+    assert cube[0, 6, 0] == 30.0
+
+
+
+# Czas lokalny: przy zmianie na zimowy (27.10) dwa różne pomiary dostają godzinę 01:00 i oba wchodzą
+# do średniej dobowej, przy zmianie na letni (31.03) doba ma 23 godziny; średnie zgadzają się z groupby
+def test_daily_mean_dst_changes():
+    for day, expected in (("2024-10-27", np.arange(1.0, 25.0).mean()), ("2024-03-31", np.arange(1.0, 24.0).mean())):
+        index = pd.date_range(f"{day} 01:00", periods=24, freq="h")  # czas GIOŚ (UTC+1), koniec godziny
+        df = pd.DataFrame({"s1": np.arange(1.0, 25.0)}, index=index)
+        df = correct_datetime_index({2024: df}, "Europe/Warsaw")[2024]
+
+        daily = daily_mean(df)
+        assert daily.loc[day, "s1"] == expected
+        assert np.allclose(daily["s1"], df.groupby(df.index.normalize())["s1"].mean())
+
+
+def make_year_df(year, seed):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(f"{year}-01-01", f"{year}-12-31 23:00", freq="h")
+    columns = pd.MultiIndex.from_arrays([["A", "A", "B"], ["s1", "s2", "s3"]], names=["Miejscowość", "Kod stacji"])
+    values = rng.gamma(2.0, 8.0, (len(index), 3))
+    values[rng.random(values.shape) < 0.05] = np.nan
+    values[index.month == 2, 1] = np.nan  # s2 bez pomiarów w lutym
+    return pd.DataFrame(values, index=index, columns=columns)
+
+
+# Kostka daje te same średnie miesięczne co monthly_mean i te same dni przekroczeń co find_above_norm
+def test_build_cube_matches_direct_aggregates():
+    df = make_year_df(2024, 0)
+    cube = build_cube(df, norm=15)
+
+    np.testing.assert_allclose(monthly_means_table(cube).to_numpy(), monthly_mean(df).to_numpy())
+    assert (exceedance_table(cube, "Kod stacji")[2024].to_numpy()
+            == find_above_norm(df, [2024], 2024, norm=15)[2024].reindex(df.columns).to_numpy()).all()
+    assert cube.loc[("A", "s2", 2024, 2), "n_godzin"] == 0
+
+
+# Zapis i odczyt kilku lat; inna wersja pliku albo różne normy to błąd
+def test_cube_round_trip_and_checks(tmp_path):
+    paths = []
+    for year in (2023, 2024):
+        paths.append(tmp_path / f"{year}.csv")
+        save_cube(build_cube(make_year_df(year, year), norm=15), paths[-1])
+
+    cube = load_cube(paths)
+    assert cube.attrs["norm"] == 15
+    pd.testing.assert_frame_equal(cube.loc[(slice(None), slice(None), 2024), :],
+                                  build_cube(make_year_df(2024, 2024), norm=15), check_dtype=False, check_index_type=False)
+
+    other_norm = tmp_path / "inna_norma.csv"
+    save_cube(build_cube(make_year_df(2024, 2024), norm=25), other_norm)
+    with pytest.raises(ValueError, match="różnych norm"):
+        load_cube([paths[0], other_norm])
+
+    old = tmp_path / "stara.csv"
+    old.write_text(paths[0].read_text(encoding="utf-8").replace("summary_cube v1", "summary_cube v0", 1),
+                   encoding="utf-8")
+    with pytest.raises(ValueError, match="wersja"):
+        load_cube(old)
+
+
+# W UTC pierwsza godzina z pliku roku Y to 31.12 roku Y-1, 23:00 - po split_calendar_years kostki
+# kolejnych lat nie dublują tego dnia, a godzina trafia do roku Y-1
+def test_cubes_for_consecutive_years_in_utc(tmp_path):
+    columns = pd.MultiIndex.from_arrays([["A"], ["s1"]], names=["Miejscowość", "Kod stacji"])
+    frames = {}
+    for year in (2023, 2024):
+        index = pd.date_range(f"{year}-01-01 01:00", f"{year + 1}-01-01 00:00", freq="h")  # czas GIOŚ
+        frames[year] = pd.DataFrame(np.full((len(index), 1), 20.0), index=index, columns=columns)
+    frames = split_calendar_years(correct_datetime_index(frames, "UTC"))
+
+    assert frames[2023].index[-1] == pd.Timestamp("2023-12-31 23:00")
+    assert (frames[2024].index.year == 2024).all()
+
+    paths = []
+    for year, df in frames.items():
+        paths.append(tmp_path / f"{year}.csv")
+        save_cube(build_cube(df, norm=15), paths[-1])
+    cube = load_cube(paths)
+
+    assert cube.index.is_unique
+    assert exceedance_table(cube, "Kod stacji").loc["s1"].tolist() == [365, 366]
+    assert cube.loc[("A", "s1", 2023, 12), "n_godzin"] == 31 * 24
+    assert monthly_means_table(cube, years=[2023]).shape == (12, 1)
@@ -0,0 +1,72 @@
+import io
+
+import pandas as pd
+from src.pm25.load_data import detect_layout, read_gios_sheet, edit_df, correct_datetime_index
+
+
+def make_raw(first_cells):
+    rows = [["Nr", 1, 2], ["Kod stacji", "MzWarAlNiepo", "SlKatoKossut"], ["Jednostka", "ug/m3", "ug/m3"]]
+    rows += [[cell, "12,5", 20.0] for cell in first_cells]
+    return pd.DataFrame(rows, dtype=object)
+
+
+def to_xlsx(raw):
+    f = io.BytesIO()
+    raw.to_excel(f, header=False, index=False)
+    f.seek(0)
+    return f
+
+
+# Nagłówek, początek danych i jednostki rozpoznawane są z pierwszych wierszy
+def test_detect_layout_text_dates():
+    layout = detect_layout(make_raw(["2024-01-01 01:00:00", "2024-01-01 02:00:00"]))
+
+    assert layout == {"header_row": 1, "data_start": 3, "date_encoding": "text", "units": "ug/m3"}
+
+
+# Daty zapisane jako liczby seryjne Excela (starsze archiwa) zamieniane są na pełne godziny
+def test_edit_df_excel_serial_dates():
+    serial = (pd.Timestamp("2010-01-01 01:00") - pd.Timestamp("1899-12-30")) / pd.Timedelta("1D")
+    df = edit_df({2010: make_raw([serial - 1e-8, serial + 1 / 24])})[2010]
+
+    assert list(df.index) == [pd.Timestamp("2010-01-01 01:00"), pd.Timestamp("2010-01-01 02:00")]
+    assert list(df.columns) == ["MzWarAlNiepo", "SlKatoKossut"]
+    assert df.iloc[0, 0] == 12.5
+
+
+# Pomiar z 00:00 należy do poprzedniej doby; przy czasie lokalnym latem dochodzi godzina CEST
+def test_correct_datetime_index_period_start():
+    index = pd.DatetimeIndex(["2024-07-01 00:00:00", "2024-07-01 01:00:30"], name="Kod stacji")
+
+    df = correct_datetime_index({2024: pd.DataFrame({"s1": [1.0, 2.0]}, index=index)})[2024]
+    assert list(df.index) == [pd.Timestamp("2024-06-30 23:00"), pd.Timestamp("2024-07-01 00:00")]
+
+    df = correct_datetime_index({2024: pd.DataFrame({"s1": [1.0, 2.0]}, index=index)}, "Europe/Warsaw")[2024]
+    assert list(df.index) == [pd.Timestamp("2024-07-01 00:00"), pd.Timestamp("2024-07-01 01:00")]
+
+
+# Arkusz z kolumną bez kodu stacji: wczytywany jest tylko blok danych, a układ trafia do attrs
+def test_read_gios_sheet_xlsx():
+    raw = make_raw(["2024-01-01 01:00:00", "2024-01-01 02:00:00", "2024-01-01 03:00:00"])
+    raw.insert(2, "pusta", [None, None, None, 7.0, 7.0, 7.0])
+    raw = pd.concat([pd.DataFrame([["Wskaźnik", "PM2.5", None, "PM2.5"]], columns=raw.columns), raw])
+
+    df = read_gios_sheet(to_xlsx(raw), n_probe=5)
+
+    assert df.attrs["gios_layout"] == {"header_row": 2, "data_start": 4, "date_encoding": "text", "units": "ug/m3"}
+    assert list(df.columns) == ["Kod stacji", "MzWarAlNiepo", "SlKatoKossut"]
+    assert list(df["Kod stacji"]) == ["2024-01-01 01:00:00", "2024-01-01 02:00:00", "2024-01-01 03:00:00"]
+    assert list(df["SlKatoKossut"]) == [20.0, 20.0, 20.0]
+
+
+# Bez etykiety "Kod stacji" nagłówkiem jest pierwszy wiersz wyglądający jak kody stacji
+def test_detect_layout_without_label():
+    raw = make_raw(["2024-01-01 01:00:00"])
+    raw.iloc[1, 0] = None
+
+    head = pd.read_excel(to_xlsx(raw), header=None)
+    layout = detect_layout(head)
+
+    assert layout["header_row"] == 1
+    assert layout["data_start"] == 3
+    assert list(read_gios_sheet(to_xlsx(raw)).columns) == ["Kod stacji", "MzWarAlNiepo", "SlKatoKossut"]
@@ -0,0 +1,66 @@
+import json
+from src.manifest import (SRC, STAGE_CODE, hash_value, load_manifest, skip_if_unchanged, stage_code,
+                          stale_reasons, write_manifest)
+
+
+def build(tmp_path, text="wynik"):
+    out = tmp_path / "out.csv"
+    out.write_text(text)
+    return str(out)
+
+
+# Bez zmian etap jest pomijany, a w manifeście zapisywane jest pominięcie
+def test_skip_when_unchanged(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    inputs = {"config": hash_value({"norm": 15})}
+    out = build(tmp_path)
+    write_manifest(manifest, "etap", inputs, [out], ["brak manifestu"])
+
+    skipped, reasons = skip_if_unchanged(manifest, "etap", inputs, [out])
+
+    assert skipped and reasons == []
+    assert load_manifest(manifest)["last_run"]["action"] == "skipped"
+    assert not skip_if_unchanged(manifest, "etap", inputs, [out], force=True)[0]
+
+
+# Zmienione lub nowe wejście wymusza przeliczenie
+def test_rebuild_when_input_changed(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    out = build(tmp_path)
+    write_manifest(manifest, "etap", {"config": hash_value({"norm": 15})}, [out], [])
+
+    skipped, reasons = skip_if_unchanged(
+        manifest, "etap", {"config": hash_value({"norm": 25}), "kod": "abc"}, [out]
+    )
+
+    assert not skipped
+    assert reasons == ["zmienione wejście: config", "zmienione wejście: kod"]
+
+
+# Zmieniony, usunięty albo nieobecny w manifeście wynik wymusza przeliczenie; brak manifestu też
+def test_rebuild_when_output_changed(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    inputs = {"config": "x"}
+    assert stale_reasons(manifest, inputs, []) == ["brak manifestu"]
+
+    out = build(tmp_path)
+    write_manifest(manifest, "etap", inputs, [out], [])
+    (tmp_path / "out.csv").write_text("zmieniony")
+    assert stale_reasons(manifest, inputs, [out]) == [f"zmieniony wynik: {out}"]
+
+    (tmp_path / "out.csv").unlink()
+    extra = str(tmp_path / "nowy.csv")
+    assert stale_reasons(manifest, inputs, [out, extra]) == [f"brak wyniku: {out}", f"brak wyniku: {extra}"]
+
+    data = json.loads(manifest.read_text())
+    data["version"] = 0
+    manifest.write_text(json.dumps(data))
+    assert stale_reasons(manifest, inputs, [out]) == ["brak manifestu"]
+
+
+# Listy plików kodu etapów wskazują istniejące pliki (ta sama lista trafia do Snakefile)
+def test_stage_code_files_exist():
+    for stage, paths in STAGE_CODE.items():
+        assert all((SRC / path).is_file() for path in paths), stage
+        assert len(stage_code(stage)) == 64
+    assert "pm25/sources.py" in STAGE_CODE["pm25"]
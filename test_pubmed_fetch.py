@@ -1,4 +1,5 @@
 import pytest
+from src.literature import pubmed_fetch
 from src.literature.pubmed_fetch import normalize_pubmed_record
 
 # Testy dla funkcji normalize_pubmed_record w pubmed_fetch.py
@@ -50,4 +51,27 @@ def test_normalize_pubmed_record_empty_pubdate():
 
     normalized = normalize_pubmed_record(record)
 
-    assert normalized["year"] == ""  # jeśli brak daty, rok też pusty
\ No newline at end of file
+    assert normalized["year"] == ""  # jeśli brak daty, rok też pusty
+
+# Tryb replay zapisuje wyniki przy pierwszym pobraniu i potem je odtwarza; tryb local tylko czyta
+def test_fetch_pubmed_from_source_replay_and_local(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_fetch(year, query, email, retmax):
+        calls.append(year)
+        return [{"PMID": "1", "title": "PM2.5 w Polsce", "year": str(year), "journal": "J", "authors": "A"}]
+
+    monkeypatch.setattr(pubmed_fetch, "fetch_pubmed", fake_fetch)
+    replay = {"mode": "replay", "path": str(tmp_path)}
+    local = {"mode": "local", "path": str(tmp_path)}
+
+    first = pubmed_fetch.fetch_pubmed_from_source(2024, "PM2.5", "a@b.pl", 10, replay)
+    assert pubmed_fetch.fetch_pubmed_from_source(2024, "PM2.5", "a@b.pl", 10, replay) == first
+    assert pubmed_fetch.fetch_pubmed_from_source(2024, "PM2.5", "a@b.pl", 10, local) == first
+    assert calls == [2024]
+
+    # inne zapytanie to inny plik, więc w trybie local go nie ma
+    with pytest.raises(FileNotFoundError):
+        pubmed_fetch.fetch_pubmed_from_source(2024, "PM10", "a@b.pl", 10, local)
+    with pytest.raises(ValueError):
+        pubmed_fetch.fetch_pubmed_from_source(2024, "PM2.5", "a@b.pl", 10, {"mode": "local"})
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from src.pm25.quality import qa_flags, spike_flags, FLAG_RANGE, FLAG_FLATLINE, FLAG_SPIKE
+
+
+def make_df():
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2024-01-01", periods=24 * 10, freq="h")
+    values = rng.normal(20, 3, (len(index), 2)).round(1)
+    values[5, 0] = -3.0          # wartość ujemna
+    values[50:70, 0] = 17.0      # zawieszony czujnik przez 20 godzin
+    values[100, 1] = 400.0       # pojedynczy skok
+    return pd.DataFrame(values, index=index, columns=["s1", "s2"])
+
+
+# Każdy rodzaj błędu dostaje swoją flagę, a poprawne pomiary zostają bez flag
+def test_qa_flags_detects_faults():
+    flags = qa_flags(make_df()).to_numpy()
+
+    assert flags[5, 0] == FLAG_RANGE
+    assert (flags[50:70, 0] & FLAG_FLATLINE).all()
+    assert flags[100, 1] & FLAG_SPIKE
+    assert (flags > 0).sum() == 1 + 20 + 1
+
+
+# Krótkie serie identycznych odczytów nie są oznaczane
+def test_qa_flags_short_runs_allowed():
+    df = make_df()
+    flags = qa_flags(df, flatline_hours=21).to_numpy()
+
+    assert not (flags[50:70, 0] & FLAG_FLATLINE).any()
+
+
+# Na danych o ciężkim ogonie (rozkład gamma) wykrywane są wszystkie wstrzyknięte skoki,
+# a zwykłych wysokich wartości oznaczanych jako skoki jest bardzo mało
+def test_spike_false_positive_rate():
+    rng = np.random.default_rng(1)
+    values = rng.gamma(2.0, 9.0, (24 * 60, 20)).round(1)
+    rows = rng.choice(np.arange(1, len(values) - 1), 20, replace=False)
+    values[rows, np.arange(20)] = 900.0
+
+    spikes = spike_flags(values)
+
+    assert spikes[rows, np.arange(20)].all()
+    assert spikes.sum() - 20 <= 0.0005 * values.size
+
+
+# Kilkudziesięciogodzinny epizod smogowy nie jest oznaczany - ani w środku, ani na początku i końcu
+def test_spike_flags_keep_smog_episode():
+    hours = np.arange(24 * 20)
+    base = 20 + 5 * np.sin(2 * np.pi * hours / 24)
+    values = np.repeat(base[:, None], 50, axis=1) + np.random.default_rng(2).normal(0, 2, (len(hours), 50))
+    values[200:260] += 150.0
+
+    assert not spike_flags(values).any()
@@ -0,0 +1,55 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src" / "pm25"))
+from service import PM25Service, PM25Store
+
+
+def make_service():
+    index = pd.date_range("2024-01-01", "2024-03-31 23:00", freq="h")
+    columns = pd.MultiIndex.from_arrays([["A", "A", "B"], ["s1", "s2", "s3"]], names=["Miejscowość", "Kod stacji"])
+    values = np.full((len(index), 3), 10.0)
+    values[index.month == 1, :2] = np.nan  # miasto A bez pomiarów w styczniu
+    values[index < "2024-01-03", 2] = 40.0  # s3: dwa dni powyżej normy
+    return PM25Service(PM25Store({2024: pd.DataFrame(values, index=index, columns=columns)}))
+
+
+def get(service, path, **params):
+    status, body = service.handle(path, {name: value if isinstance(value, list) else [str(value)]
+                                         for name, value in params.items()})
+    return status, json.loads(body)
+
+
+# Odpowiedzi tras są poprawnym JSON-em; miesiące bez pomiarów to null
+def test_routes():
+    service = make_service()
+
+    assert get(service, "/health") == (200, {"years": [2024], "stations": 3})
+
+    status, body = get(service, "/monthly", city=["A"], year=2024)
+    assert status == 200
+    assert body["A"]["2024"][:3] == [None, 10.0, 10.0] and body["A"]["2024"][3] is None
+
+    status, body = get(service, "/top", n=1, norm=15)
+    assert status == 200 and body == [{"miejscowość": "B", "kod_stacji": "s3", "dni": 2}]
+
+    status, body = get(service, "/exceedances", norm=15, year=2024)
+    assert status == 200 and [s["dni"] for s in body["stations"]] == [0, 0, 2]
+
+
+# Nieznana ścieżka - 404, złe parametry - 400, nieoczekiwany błąd - 500
+def test_error_statuses(monkeypatch):
+    service = make_service()
+
+    assert get(service, "/nieznana")[0] == 404
+    assert get(service, "/monthly")[0] == 400  # brak parametru city
+    assert get(service, "/top", n="dużo")[0] == 400
+    assert get(service, "/monthly", city=["Z"])[0] == 400
+
+    monkeypatch.setattr(service.store, "top_stations", lambda *args: 1 / 0)
+    status, body = get(service, "/top")
+    assert status == 500 and "ZeroDivisionError" in body["error"]
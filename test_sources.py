@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src" / "pm25"))
+from sources import LocalSource, MirrorSource, ReplaySource, Source, make_source
+
+
+class FakeUpstream(Source):
+    def __init__(self):
+        self.calls = []
+
+    def fetch(self, key):
+        self.calls.append(key)
+        return f"plik {key}".encode()
+
+    def fingerprint(self, key):
+        return f"fake/{key}"
+
+
+# LocalSource czyta plik <katalog>/<id>, a prefetch pobiera każdy identyfikator raz
+def test_local_source_and_prefetch(tmp_path):
+    (tmp_path / "582").write_bytes(b"archiwum 2024")
+    (tmp_path / "622").write_bytes(b"metadane")
+    source = LocalSource(tmp_path)
+
+    assert source.fetch("582") == b"archiwum 2024"
+    assert source.prefetch(["582", "622", "582"]) == {"582": b"archiwum 2024", "622": b"metadane"}
+
+    upstream = FakeUpstream()
+    assert upstream.prefetch(["1", "2", "1"], workers=4) == {"1": b"plik 1", "2": b"plik 2"}
+    assert sorted(upstream.calls) == ["1", "2"]
+
+
+# Pierwsze pobranie jest nagrywane, kolejne odtwarzane bez sięgania do źródła;
+# bez nagrywania brak pliku to błąd
+def test_replay_source_records_then_replays(tmp_path):
+    upstream = FakeUpstream()
+    source = ReplaySource(tmp_path / "nagrania", upstream)
+
+    assert source.fetch("582") == b"plik 582"
+    assert source.fetch("582") == b"plik 582"
+    assert upstream.calls == ["582"]
+    assert (tmp_path / "nagrania" / "582").read_bytes() == b"plik 582"
+    assert source.fingerprint("582") == LocalSource(tmp_path / "nagrania").fingerprint("582")
+
+    with pytest.raises(FileNotFoundError):
+        ReplaySource(tmp_path / "nagrania", upstream, record=False).fetch("622")
+
+
+# Brak wymaganych kluczy w sekcji sources (np. mirror_url: null) to błąd, a nie adres "None622"
+def test_make_source_validates_config(tmp_path):
+    assert isinstance(make_source({"mode": "mirror", "mirror_url": "http://lustro/"}), MirrorSource)
+    assert isinstance(make_source({"mode": "replay", "path": str(tmp_path)}), ReplaySource)
+
+    for config in ({"mode": "mirror", "mirror_url": None}, {"mode": "local"}, {"mode": "replay", "path": ""},
+                   {"mode": "ftp"}):
+        with pytest.raises(ValueError):
+            make_source(config)
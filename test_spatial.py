@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import src.pm25.spatial as spatial
+from src.pm25.spatial import StationIndex
+
+
+def make_metadata():
+    return pd.DataFrame({
+        "Kod stacji": ["MzWarAlNiepo", "MzWarMarszal", "MpKrakBujaka", "PmGdaLeczkow", "XxBezWspol"],
+        "WGS84 φ N": [52.219, "52,225", 50.058, 54.380, None],
+        "WGS84 λ E": [21.005, "21,012", 19.926, 18.620, None],
+    })
+
+
+# Najbliższe stacje i promień (Warszawa - Kraków to ok. 250 km); stacje bez współrzędnych są pomijane
+def test_nearest_and_within_radius():
+    index = StationIndex.from_metadata(make_metadata())
+    assert len(index) == 4
+
+    nearest = index.nearest(52.23, 21.01, k=3)
+    assert list(nearest.index[:2]) == ["MzWarMarszal", "MzWarAlNiepo"]
+    assert nearest.iloc[2] == nearest["MpKrakBujaka"]
+    assert 240 < nearest["MpKrakBujaka"] < 260
+
+    assert set(index.within_radius(52.23, 21.01, 5).index) == {"MzWarAlNiepo", "MzWarMarszal"}
+    assert set(index.within_radius(52.23, 21.01, 270).index) == {"MzWarAlNiepo", "MzWarMarszal", "MpKrakBujaka"}
+
+
+# IDW dla wielu dni naraz: w położeniu stacji wartość tej stacji, braki danych tylko zmieniają wagi,
+# a wynik bez scipy jest taki sam jak z drzewem KD
+def test_idw_grid_days_and_gaps(monkeypatch):
+    metadata = make_metadata()
+    columns = pd.MultiIndex.from_arrays(
+        [["Warszawa", "Kraków", "Gdańsk"], ["MzWarAlNiepo", "MpKrakBujaka", "PmGdaLeczkow"]],
+        names=["Miejscowość", "Kod stacji"]
+    )
+    daily = pd.DataFrame([[10.0, 30.0, 20.0], [np.nan, 30.0, np.nan], [np.nan] * 3],
+                         index=pd.date_range("2024-01-01", periods=3), columns=columns)
+    lats, lons = np.array([52.219, 51.0]), np.array([21.005, 19.0])
+
+    index = StationIndex.from_metadata(metadata)
+    estimate = index.idw_grid(daily, lats, lons)
+    assert estimate.shape == (3, 2, 2)
+    assert np.isclose(estimate[0, 0, 0], 10.0)
+    assert 10.0 < estimate[0, 1, 1] < 30.0
+    assert np.allclose(estimate[1], 30.0)
+    assert np.isnan(estimate[2]).all()
+
+    monkeypatch.setattr(spatial, "cKDTree", None)
+    brute = StationIndex.from_metadata(metadata)
+    assert brute.tree is None
+    np.testing.assert_allclose(brute.idw_grid(daily, lats, lons, k=2), index.idw_grid(daily, lats, lons, k=2))
+    assert list(brute.within_radius(52.23, 21.01, 270).index) == list(index.within_radius(52.23, 21.01, 270).index)